@@ -5,7 +5,9 @@ from PySide6.QtGui import QIcon, QAction
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
 
 from src.main import MainWindow
-from src.config import window_icon_path
+from src.config import window_icon_path, metrics_port, event_stream_address
+from src.metrics import MetricsServer
+from src.event_stream import EVENT_STREAM
 
 if __name__ == "__main__":
     # Set the appid so the icon is shown in the taskbar
@@ -34,6 +36,15 @@ if __name__ == "__main__":
     # add menu to the tray
     tray.setContextMenu(menu)
 
+    if metrics_port:
+        metrics_server = MetricsServer(port=metrics_port)
+        metrics_server.start()
+
+    if event_stream_address:
+        EVENT_STREAM.start(event_stream_address)
+
     w = MainWindow()
     w.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    EVENT_STREAM.stop()
+    sys.exit(exit_code)
@@ -0,0 +1,97 @@
+"""
+Per-frame inference cost of the gesture classifier, fails when over the 1 ms budget.
+
+    python -m benchmarks.classifier
+    python -m benchmarks.classifier --model models/gestures.npz
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from src.classifier import (
+    FEATURES_COUNT,
+    ClassifierSource,
+    GestureModel,
+)
+from src.utils import POSE_LANDMARKS_COUNT
+
+BUDGET_MS = 1.0
+
+
+class FakeBody:
+    def __init__(self):
+        self.pose_array = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+        self.world_array = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+        self.state = {"FACE_DIRECTION_X": 0.0, "FACE_DIRECTION_Y": 0.0}
+
+
+def random_model(kind, labels_count, samples):
+    rng = np.random.default_rng(0)
+    labels = [f"movement_{i}" for i in range(labels_count)]
+    types = ["click"] * labels_count
+    mean = np.zeros(FEATURES_COUNT)
+    std = np.ones(FEATURES_COUNT)
+    if kind == "logistic":
+        return GestureModel(
+            kind,
+            labels,
+            types,
+            mean,
+            std,
+            weights=rng.standard_normal((FEATURES_COUNT, labels_count)),
+            bias=np.zeros(labels_count),
+        )
+    return GestureModel(
+        kind,
+        labels,
+        types,
+        mean,
+        std,
+        samples=rng.standard_normal((samples, FEATURES_COUNT)),
+        sample_labels=rng.integers(0, labels_count, samples),
+    )
+
+
+def measure(source, frames):
+    rng = np.random.default_rng(1)
+    body = FakeBody()
+    poses = rng.random((frames, POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+
+    timings = np.empty(frames)
+    for i, pose in enumerate(poses):
+        body.pose_array[:] = pose
+        body.world_array[:] = pose
+        start = time.perf_counter()
+        source.detect(body, 0)
+        timings[i] = time.perf_counter() - start
+
+    return timings * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", help="trained model, random models when omitted")
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--labels", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=16 * 300)
+    args = parser.parse_args()
+
+    if args.model:
+        models = {args.model: GestureModel.load(args.model)}
+    else:
+        models = {
+            kind: random_model(kind, args.labels, args.samples)
+            for kind in ("logistic", "knn")
+        }
+
+    over_budget = False
+    print(f"{'model':>20} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, model in models.items():
+        timings = measure(ClassifierSource(model), args.frames)
+        p99 = np.percentile(timings, 99)
+        print(f"{name:>20} {timings.mean():>8.3f} {p99:>8.3f} {timings.max():>8.3f}")
+        over_budget |= p99 > BUDGET_MS
+
+    if over_budget:
+        print(f"over the {BUDGET_MS} ms per-frame budget")
+        sys.exit(1)
@@ -0,0 +1,269 @@
+"""
+Throughput of the gesture engine stages in isolation, on synthetic gestures:
+
+    results     BodyState.update_state from mediapipe-like results
+    features    BodyState.update_state_arrays (coordinates, angles, slopes)
+    movements   BodyState.detect_movement, movements go to a counter
+    events      Events.add + flush for the movements found above
+    pipeline    BodyState.calculate_arrays, everything up to the input backend
+
+Results are compared with a saved baseline (frames/sec per stage), and the run
+fails when a stage is slower than the baseline by more than --max-slowdown.
+
+    python -m benchmarks.gesture_engine --save-baseline
+    python -m benchmarks.gesture_engine --frames 2000000
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from copy import deepcopy
+import numpy as np
+from src.body import BodyState
+from src.config import default_body_config, default_events_config
+from src.events import Events
+from src.input_backend import RecordingBackend
+from src.latency import LatencyTracker
+from src.scheduler import InputScheduler
+from src.synthetic import FPS, LandmarkResults, generate_sequence
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "gesture_engine.json")
+
+# one minute of gestures, looped
+PARTS = [
+    ("idle", 5), ("walk", 10), ("left_swing", 8), ("right_swing", 8),
+    ("jump", 10), ("head_turn", 10), ("walk", 9),
+]
+STAGES = ("results", "features", "movements", "events", "pipeline")
+
+
+class DirectOutput:
+    """OutputDispatcher interface writing straight to the backend, no thread."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def press(self, key, origin=None):
+        self.backend.press(key)
+
+    def release(self, key, origin=None):
+        self.backend.release(key)
+
+    def mouse_press(self, button, origin=None):
+        self.backend.mouse_press(button)
+
+    def mouse_release(self, button, origin=None):
+        self.backend.mouse_release(button)
+
+    def scroll(self, dy, origin=None):
+        self.backend.scroll(dy)
+
+
+class DirectMouse:
+    def __init__(self):
+        self.direction = (0, 0)
+
+    def set_direction(self, x, y, origin=None):
+        self.direction = (x, y)
+
+
+class MovementCounter:
+    """Events stand-in for detect_movement, keeps (timestamp, name, type) of each movement."""
+
+    def __init__(self, command_key_mappings):
+        self.command_key_mappings = command_key_mappings
+        self.movements = []
+
+    def add(self, command_name, command_type, timestamp):
+        self.movements.append((timestamp, command_name, command_type))
+
+
+class Engine:
+    def __init__(self):
+        self.now = 0.0
+        clock = lambda: self.now
+        self.backend = RecordingBackend(clock)
+        self.scheduler = InputScheduler(clock)
+        self.output = DirectOutput(self.backend)
+        self.mouse = DirectMouse()
+        self.latency = LatencyTracker()
+        self.body = BodyState(
+            dict(default_body_config, trajectory_templates_dir=None, classifier_model=None),
+            deepcopy(default_events_config),
+            self.mouse,
+            self.scheduler,
+            self.output,
+            self.latency,
+        )
+
+    def new_events(self):
+        config = deepcopy(default_events_config)
+        return Events(**config, mouse_thread=self.mouse, scheduler=self.scheduler, output=self.output, latency=self.latency)
+
+    def tick(self, timestamp):
+        self.now = timestamp / 1000
+        self.scheduler.run_due(self.now)
+        if len(self.backend.events) > 10000:
+            self.backend.clear()
+
+
+def frame_at(sequence, i):
+    n = len(sequence["pose"])
+    # timestamps keep increasing over the loops
+    loop, j = divmod(i, n)
+    duration = n * 1000 / FPS
+    return (
+        sequence["timestamp"][j] + loop * duration,
+        sequence["pose"][j],
+        sequence["world"][j],
+        sequence["face"][j].tolist(),
+    )
+
+
+def bench_results(engine, sequence, frames):
+    body = engine.body
+    results = LandmarkResults()
+    # only the shape is read without face landmarks
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    elapsed = 0.0
+    for i in range(frames):
+        _, pose, world, _ = frame_at(sequence, i)
+        results.set(pose, world)
+        start = time.perf_counter()
+        body.update_state(results, image)
+        elapsed += time.perf_counter() - start
+    return elapsed, frames
+
+
+def bench_features(engine, sequence, frames):
+    body = engine.body
+    elapsed = 0.0
+    for i in range(frames):
+        _, pose, world, face = frame_at(sequence, i)
+        start = time.perf_counter()
+        body.update_state_arrays(pose, world, face)
+        elapsed += time.perf_counter() - start
+    return elapsed, frames
+
+
+def bench_movements(engine, sequence, frames):
+    body = engine.body
+    events = body.events
+    body.events = counter = MovementCounter(events.command_key_mappings)
+    elapsed = 0.0
+    try:
+        for i in range(frames):
+            timestamp, pose, world, face = frame_at(sequence, i)
+            body.update_state_arrays(pose, world, face)
+            start = time.perf_counter()
+            body.detect_movement(timestamp)
+            elapsed += time.perf_counter() - start
+    finally:
+        body.events = events
+    return elapsed, frames, counter.movements
+
+
+def bench_events(engine, movements, frames):
+    events = engine.new_events()
+    by_frame = {}
+    for timestamp, name, movement_type in movements:
+        by_frame.setdefault(timestamp, []).append((name, movement_type))
+
+    elapsed = 0.0
+    count = 0
+    for timestamp, fired in by_frame.items():
+        engine.tick(timestamp)
+        start = time.perf_counter()
+        for name, movement_type in fired:
+            events.add(name, movement_type, timestamp)
+        events.flush()
+        elapsed += time.perf_counter() - start
+        count += len(fired)
+    events.reset()
+    # per frame, frames without movements cost nothing here
+    return elapsed, frames, count
+
+
+def bench_pipeline(engine, sequence, frames):
+    body = engine.body
+    elapsed = 0.0
+    for i in range(frames):
+        timestamp, pose, world, face = frame_at(sequence, i)
+        engine.tick(timestamp)
+        start = time.perf_counter()
+        body.calculate_arrays(pose, world, timestamp, face)
+        elapsed += time.perf_counter() - start
+    body.events.reset()
+    return elapsed, frames
+
+
+def run(frames):
+    sequence = generate_sequence(PARTS)
+    engine = Engine()
+    result = {}
+
+    elapsed, n = bench_results(engine, sequence, frames)
+    result["results"] = n / elapsed
+    elapsed, n = bench_features(engine, sequence, frames)
+    result["features"] = n / elapsed
+    elapsed, n, movements = bench_movements(engine, sequence, frames)
+    result["movements"] = n / elapsed
+    elapsed, n, count = bench_events(engine, movements, frames)
+    result["events"] = n / elapsed
+    elapsed, n = bench_pipeline(engine, sequence, frames)
+    result["pipeline"] = n / elapsed
+
+    fired = Counter(name for _, name, _ in movements)
+    return result, fired
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200_000, help="frames per stage")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="allowed fraction below the baseline")
+    args = parser.parse_args()
+
+    result, fired = run(args.frames)
+    print(f"{args.frames} frames per stage, movements: {dict(fired)}")
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    slower = []
+    print(f"{'stage':>10} {'frames/s':>12} {'us/frame':>9} {'baseline':>12} {'ratio':>6}")
+    for stage in STAGES:
+        fps = result[stage]
+        line = f"{stage:>10} {fps:>12,.0f} {1e6 / fps:>9.2f}"
+        if baseline and stage in baseline["frames_per_second"]:
+            base = baseline["frames_per_second"][stage]
+            ratio = fps / base
+            line += f" {base:>12,.0f} {ratio:>6.2f}"
+            if ratio < 1 - args.max_slowdown:
+                slower.append(stage)
+        print(line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                dict(
+                    frames=args.frames,
+                    python=platform.python_version(),
+                    machine=platform.platform(),
+                    frames_per_second=result,
+                ),
+                f,
+                indent=2,
+            )
+        print(f"saved baseline to {args.baseline}")
+
+    if slower:
+        print(f"slower than the baseline: {', '.join(slower)}")
+        sys.exit(1)
@@ -0,0 +1,142 @@
+"""
+Memory regression check of the gesture pipeline (BodyState -> Events -> inputs),
+replaying landmarks without a camera or mediapipe. Fails when the steady-state
+allocations per frame or the resident memory growth over the replay are over budget.
+
+    python -m benchmarks.memory_budget
+    python -m benchmarks.memory_budget --minutes 10 --session recordings/session-x.npz
+"""
+import argparse
+import os
+import sys
+from copy import deepcopy
+import numpy as np
+from src.allocations import AllocationTracker
+from src.body import BodyState
+from src.config import default_body_config, default_events_config
+from src.dispatcher import OutputDispatcher
+from src.input_backend import RecordingBackend
+from src.latency import LatencyTracker
+from src.mouse_thread import MouseThread
+from src.scheduler import InputScheduler
+from src.synthetic import FPS, LandmarkResults, generate_sequence
+
+# 30 s of mixed gestures, looped over the replay
+SYNTHETIC_PARTS = [
+    ("idle", 3), ("walk", 6), ("left_swing", 4), ("right_swing", 4),
+    ("jump", 5), ("head_turn", 4), ("walk", 4),
+]
+
+# steady state, after warm up
+BUDGET_NET_BYTES_PER_FRAME = 64  # bytes still allocated after each frame, on average
+BUDGET_PEAK_KIB_PER_FRAME = 64  # transient allocations during a frame
+BUDGET_RSS_GROWTH_MIB = 16  # resident memory growth over the whole replay
+
+
+def resident_memory():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Replay:
+    def __init__(self):
+        self.now = 0.0
+        clock = lambda: self.now
+        self.backend = RecordingBackend(clock)
+        self.mouse_thread = MouseThread(self.backend)
+        self.scheduler = InputScheduler(clock)
+        self.output = OutputDispatcher(self.backend)
+        body_config = dict(default_body_config, trajectory_templates_dir=None, classifier_model=None)
+        self.body = BodyState(
+            body_config,
+            deepcopy(default_events_config),
+            self.mouse_thread,
+            self.scheduler,
+            self.output,
+            LatencyTracker(),
+        )
+        self.results = LandmarkResults()
+        self.image = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def start(self):
+        self.mouse_thread.start()
+        self.output.start()
+
+    def stop(self):
+        self.output.stop()
+        self.mouse_thread.stop()
+
+    def frame(self, i, pose, world):
+        self.now = i / FPS
+        self.results.set(pose, world)
+        self.body.calculate(self.image, self.results, self.now * 1000)
+        self.scheduler.run_due(self.now)
+        # the recorded inputs belong to the benchmark, not to the pipeline
+        if len(self.backend.events) > 1000:
+            self.backend.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--session", help="recorded session .npz, synthetic poses when omitted")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--warmup", type=int, default=600, help="frames before measuring")
+    parser.add_argument("--measured", type=int, default=3000, help="frames measured with tracemalloc")
+    args = parser.parse_args()
+
+    frames = max(int(args.minutes * 60 * FPS), args.warmup + args.measured)
+    session = np.load(args.session) if args.session else generate_sequence(SYNTHETIC_PARTS)
+    repeat = -(-frames // len(session["pose"]))
+    poses = np.tile(session["pose"], (repeat, 1, 1))[:frames]
+    worlds = np.tile(session["world"], (repeat, 1, 1))[:frames]
+
+    replay = Replay()
+    replay.start()
+    try:
+        for i in range(args.warmup):
+            replay.frame(i, poses[i], worlds[i])
+
+        # per-frame allocations
+        tracker = AllocationTracker(enabled=True)
+        measured_end = args.warmup + args.measured
+        for i in range(args.warmup, measured_end):
+            tracker.begin()
+            replay.frame(i, poses[i], worlds[i])
+            tracker.mark("frame")
+        tracker.stop()
+        net, peak, blocks = tracker.stages["frame"].per_frame()
+
+        # resident memory over the rest of the replay
+        rss_start = resident_memory()
+        for i in range(measured_end, frames):
+            replay.frame(i, poses[i], worlds[i])
+        rss_growth = (resident_memory() - rss_start) / 1024 / 1024
+    finally:
+        replay.stop()
+
+    commands = sum(command.commands_count for command in replay.body.events.commands_map.values())
+    print(f"{frames} frames ({args.minutes} min), {commands} commands")
+    print(f"net {net:+.1f} B/frame (budget {BUDGET_NET_BYTES_PER_FRAME}), {blocks:+.2f} blocks/frame")
+    print(f"peak {peak / 1024:.1f} KiB/frame (budget {BUDGET_PEAK_KIB_PER_FRAME})")
+    print(f"resident memory growth {rss_growth:+.1f} MiB (budget {BUDGET_RSS_GROWTH_MIB})")
+
+    over_budget = (
+        net > BUDGET_NET_BYTES_PER_FRAME
+        or peak / 1024 > BUDGET_PEAK_KIB_PER_FRAME
+        or rss_growth > BUDGET_RSS_GROWTH_MIB
+    )
+    if over_budget:
+        print("over the memory budget")
+        sys.exit(1)
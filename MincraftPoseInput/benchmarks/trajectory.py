@@ -0,0 +1,64 @@
+"""
+Cost per frame of trajectory template matching.
+
+    python -m benchmarks.trajectory
+"""
+import argparse
+import time
+import numpy as np
+from src.trajectory import (
+    DEFAULT_TEMPLATE_LANDMARKS,
+    MAX_TRAJECTORY_TEMPLATES,
+    TrajectoryMatcher,
+    TrajectoryTemplate,
+)
+from src.utils import POSE_LANDMARKS_COUNT
+
+
+class FakeBody:
+    def __init__(self):
+        self.pose_array = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+
+
+def random_poses(rng, frames):
+    poses = rng.random((frames, POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+    # keep the shoulders apart so the normalisation scale is sane
+    poses[:, 11, 0] = 0.4
+    poses[:, 12, 0] = 0.6
+    return poses
+
+
+def run(template_lengths, templates_count, frames):
+    rng = np.random.default_rng(0)
+    body = FakeBody()
+    inputs = random_poses(rng, frames)
+
+    print(f"{'length':>8} {'templates':>10} {'us/frame':>10} {'us/frame/template':>18}")
+    for length in template_lengths:
+        templates = [
+            TrajectoryTemplate(
+                f"t{i}", "click", DEFAULT_TEMPLATE_LANDMARKS, random_poses(rng, length)
+            )
+            for i in range(templates_count)
+        ]
+        matcher = TrajectoryMatcher(templates)
+
+        start = time.perf_counter()
+        for pose in inputs:
+            body.pose_array[:] = pose
+            matcher.detect(body, 0)
+        elapsed = (time.perf_counter() - start) / frames * 1e6
+
+        print(
+            f"{length:>8} {templates_count:>10} {elapsed:>10.1f} "
+            f"{elapsed / templates_count:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[30, 60, 120, 240])
+    parser.add_argument("--templates", type=int, default=MAX_TRAJECTORY_TEMPLATES)
+    parser.add_argument("--frames", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.lengths, min(args.templates, MAX_TRAJECTORY_TEMPLATES), args.frames)
@@ -0,0 +1,185 @@
+"""
+Runs capture -> inference -> gestures -> inputs without Qt or a window, and prints
+stats to stdout. Stop with Ctrl+C.
+
+    python headless.py --camera 0 --model-complexity 1
+    python headless.py --camera video.mp4 --backend recording
+    python headless.py --replay recordings/session-x.npz --backend recording --fast
+    python headless.py --source shared_memory --mapping tracker-mapping.json
+    python headless.py --source socket --source-host 192.168.1.20
+"""
+import argparse
+import json
+import time
+from copy import deepcopy
+import cv2
+import numpy as np
+from src.config import AppConfig, default_body_config, event_stream_address, metrics_port
+from src.event_stream import EVENT_STREAM
+from src.input_backend import INPUT_BACKENDS
+from src.landmark_sources import create_landmark_source
+from src.metrics import MetricsServer
+from src.pipeline import GesturePipeline, create_holistic
+
+
+def run_camera(pipeline: GesturePipeline, camera: str, stats_interval: float, duration: float):
+    # a number is a camera port, anything else a video file
+    video_file = not camera.isdigit()
+    cap = cv2.VideoCapture(camera if video_file else int(camera))
+    pipeline.capture_clock.start()
+    start = last_stats = time.perf_counter()
+    try:
+        with create_holistic(pipeline.mp_config) as holistic:
+            while cap.isOpened():
+                frame = pipeline.step(cap, holistic)
+                if frame is None and video_file:
+                    break
+                now = time.perf_counter()
+                if now - last_stats >= stats_interval:
+                    last_stats = now
+                    pipeline.print_stats(now - start)
+                if duration and now - start >= duration:
+                    break
+    finally:
+        cap.release()
+    return time.perf_counter() - start
+
+
+def run_source(pipeline: GesturePipeline, source, stats_interval: float, duration: float):
+    source.start()
+    start = last_stats = time.perf_counter()
+    try:
+        while not duration or time.perf_counter() - start < duration:
+            try:
+                pipeline.step_source(source, timeout=0.5)
+            except EOFError:
+                break
+            now = time.perf_counter()
+            if now - last_stats >= stats_interval:
+                last_stats = now
+                pipeline.print_stats(now - start, source.get_log_rows())
+    finally:
+        source.stop()
+    return time.perf_counter() - start
+
+
+def run_replay(pipeline: GesturePipeline, path: str, stats_interval: float, duration: float, fast: bool):
+    with np.load(path) as data:
+        timestamps = data["timestamp"]
+        poses = data["pose"]
+        worlds = data["world"]
+        faces = data["face"].tolist()
+
+    start = last_stats = time.perf_counter()
+    for i in range(len(timestamps)):
+        offset = (timestamps[i] - timestamps[0]) / 1000
+        if duration and offset >= duration:
+            break
+        # recorded pace, release timers run on the real clock
+        if not fast:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        pipeline.process_arrays(poses[i], worlds[i], float(timestamps[i]), faces[i])
+
+        now = time.perf_counter()
+        if now - last_stats >= stats_interval:
+            last_stats = now
+            pipeline.print_stats(now - start)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--camera", default="0", help="camera port or video file")
+    parser.add_argument(
+        "--source",
+        choices=("mediapipe", "socket", "shared_memory"),
+        help="where landmarks come from (default from the config)",
+    )
+    parser.add_argument("--source-host", help="socket source: server address")
+    parser.add_argument("--source-port", type=int, help="socket source: server port")
+    parser.add_argument("--source-transport", choices=("udp", "tcp"), help="socket source")
+    parser.add_argument("--shared-memory-name", help="shared_memory source: block name")
+    parser.add_argument("--mapping", help='JSON file {"NOSE": 0, ...}: source index of each landmark')
+    parser.add_argument("--replay", help="recorded session .npz instead of the camera, no mediapipe")
+    parser.add_argument("--fast", action="store_true", help="replay as fast as possible")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2))
+    parser.add_argument("--min-detection-confidence", type=float)
+    parser.add_argument("--min-tracking-confidence", type=float)
+    parser.add_argument("--segmentation", action="store_true")
+    parser.add_argument("--backend", choices=list(INPUT_BACKENDS), help="where inputs go")
+    parser.add_argument("--keyboard-disabled", action="store_true", help="detect gestures only")
+    parser.add_argument("--movements", help="movements file (default from the config)")
+    parser.add_argument("--record", action="store_true", help="save the landmarks as a session on exit")
+    parser.add_argument("--duration", type=float, help="seconds, until Ctrl+C otherwise")
+    parser.add_argument("--stats-interval", type=float, default=5, help="seconds between stats")
+    parser.add_argument("--metrics-port", type=int, default=metrics_port)
+    parser.add_argument(
+        "--events", default=event_stream_address, help="publish gesture events, tcp://host:port or unix:///path"
+    )
+    args = parser.parse_args()
+
+    app_config = AppConfig()
+    app_config.mp_config = dict(app_config.mp_config)
+    for key, value in (
+        ("model_complexity", args.model_complexity),
+        ("min_detection_confidence", args.min_detection_confidence),
+        ("min_tracking_confidence", args.min_tracking_confidence),
+    ):
+        if value is not None:
+            app_config.mp_config[key] = value
+    app_config.mp_config["enable_segmentation"] = args.segmentation
+    # nothing is drawn without a window
+    app_config.body_config = dict(default_body_config, draw_angles=False)
+    if args.movements:
+        app_config.body_config["movements_file"] = args.movements
+    app_config.events_config = deepcopy(app_config.events_config)
+    if args.keyboard_disabled:
+        app_config.events_config["keyboard_enabled"] = False
+    if args.backend:
+        app_config.input_backend = args.backend
+
+    source_config = dict(app_config.landmark_source)
+    for key, value in (
+        ("type", args.source),
+        ("host", args.source_host),
+        ("port", args.source_port),
+        ("transport", args.source_transport),
+        ("shared_memory_name", args.shared_memory_name),
+    ):
+        if value is not None:
+            source_config[key] = value
+    if args.mapping:
+        with open(args.mapping, encoding="utf-8") as f:
+            source_config["mapping"] = json.load(f)
+
+    if args.metrics_port:
+        metrics_server = MetricsServer(port=args.metrics_port)
+        metrics_server.start()
+
+    if args.events:
+        EVENT_STREAM.start(args.events)
+
+    pipeline = GesturePipeline(app_config)
+    if args.record:
+        pipeline.recorder.start("headless")
+    pipeline.start()
+    elapsed = 0
+    start = time.perf_counter()
+    try:
+        if args.replay:
+            elapsed = run_replay(pipeline, args.replay, args.stats_interval, args.duration, args.fast)
+        elif source_config["type"] != "mediapipe":
+            source = create_landmark_source(source_config)
+            elapsed = run_source(pipeline, source, args.stats_interval, args.duration)
+        else:
+            print("run mediapipe", pipeline.mp_config)
+            elapsed = run_camera(pipeline, args.camera, args.stats_interval, args.duration)
+    except KeyboardInterrupt:
+        elapsed = time.perf_counter() - start
+    finally:
+        pipeline.stop()
+        pipeline.recorder.stop()
+    pipeline.print_stats(elapsed)
+    EVENT_STREAM.stop()
@@ -0,0 +1,87 @@
+import sys
+import tracemalloc
+
+
+class StageAllocations:
+    __slots__ = ("frames", "bytes", "peak", "blocks")
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0  # net bytes still allocated at the end of the stage
+        self.peak = 0  # bytes allocated at the highest point during the stage
+        self.blocks = 0  # net allocated blocks (objects, buffers, ...)
+
+    def per_frame(self):
+        frames = self.frames or 1
+        return self.bytes / frames, self.peak / frames, self.blocks / frames
+
+
+class AllocationTracker:
+    """
+    Per-stage allocations of the frame loop, with tracemalloc. Call begin() before a
+    frame and mark(stage) after each stage; each mark measures since the previous one.
+    Costs nothing while disabled, tracemalloc itself slows Python code down a lot, so
+    only enable it to find where a frame allocates.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.stages = {}
+        self.enabled = False
+        if enabled:
+            self.start()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.stages = {}
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        tracemalloc.stop()
+
+    def begin(self):
+        if not self.enabled:
+            return
+        tracemalloc.reset_peak()
+        self.last_bytes = tracemalloc.get_traced_memory()[0]
+        self.last_blocks = sys.getallocatedblocks()
+
+    def mark(self, stage: str):
+        if not self.enabled:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+
+        allocations = self.stages.get(stage)
+        if allocations is None:
+            allocations = self.stages[stage] = StageAllocations()
+        allocations.frames += 1
+        allocations.bytes += current - self.last_bytes
+        allocations.peak += peak - self.last_bytes
+        allocations.blocks += blocks - self.last_blocks
+
+        # the bookkeeping above is not counted in the next stage
+        tracemalloc.reset_peak()
+        self.last_bytes = tracemalloc.get_traced_memory()[0]
+        self.last_blocks = sys.getallocatedblocks()
+
+    def reset(self):
+        self.stages = {}
+
+    def get_log_rows(self):
+        if not self.enabled:
+            return []
+        rows = []
+        for stage, allocations in self.stages.items():
+            net, peak, blocks = allocations.per_frame()
+            rows.append(
+                (
+                    f"Alloc {stage}",
+                    f"{peak / 1024:.1f} KiB peak, {net:+.0f} B, {blocks:+.1f} blocks / frame",
+                )
+            )
+        return rows
+
+    def __str__(self):
+        return "\n".join(f"{name}: {value}" for name, value in self.get_log_rows())
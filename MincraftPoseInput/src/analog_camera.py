@@ -0,0 +1,23 @@
+import math
+
+ANALOG_CAMERA_OWNER = "analog_camera"
+
+
+# Map a head angle (degrees) to -1..1 through a deadzone and a response curve
+def analog_axis(value, center, deadzone, max_angle, curve):
+    if value is None:
+        return 0.0
+    offset = value - center
+    active = abs(offset) - deadzone
+    if active <= 0:
+        return 0.0
+    amount = min(active / max(max_angle - deadzone, 1e-6), 1.0) ** curve
+    return math.copysign(amount, offset)
+
+
+# Face direction -> mouse direction, FACE_DIRECTION_Y is the yaw and FACE_DIRECTION_X the pitch
+def face_to_mouse_direction(face_x, face_y, deadzone, max_angle, curve, center_x=0, center_y=0):
+    return (
+        -analog_axis(face_y, center_y, deadzone, max_angle, curve),
+        -analog_axis(face_x, center_x, deadzone, max_angle, curve),
+    )
@@ -1,16 +1,16 @@
-import cv2
 import numpy as np
-import mediapipe as mp
 import traceback
+import time
 from copy import deepcopy
 from .utils import (
     get_landmark_coordinates,
     calculate_angle,
-    log_landmark,
     log_angle,
     calculate_slope,
     calculate_2d_angle,
     compare_nums,
+    POSE_LANDMARKS_COUNT,
+    POSE_LANDMARK_NAMES,
 )
 from .events import Events
 from .movements import (
@@ -19,10 +19,11 @@ from .movements import (
     default_movements_config,
 )
 from.face_direction import caculate_face_direction
-
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
-mp_pose = mp.solutions.pose
+from .trajectory import TrajectoryMatcher
+from .classifier import ClassifierSource
+from .analog_camera import ANALOG_CAMERA_OWNER, face_to_mouse_direction
+from .latency import InputOrigin
+from .metrics import POSE_FRAMES, GESTURES_DETECTED
 
 
 LANDMARK_NAMES = [
@@ -55,6 +56,9 @@ LANDMARK_NAMES = [
     "LEFT_FOOT_INDEX"
 ]
 
+# (name, mediapipe pose landmark index)
+LANDMARK_INDEXES = [(name, POSE_LANDMARK_NAMES.index(name)) for name in LANDMARK_NAMES]
+
 ANGLES = [
     dict(name="LEFT_SHOULDER", landmarks=("LEFT_ELBOW", "LEFT_SHOULDER", "LEFT_HIP")),
     dict(
@@ -109,16 +113,76 @@ def angle_key_name(name):
 def slope_key_name(name):
     return f"SLOPE_{name}"
 
+
+# angles named after a landmark are labeled on the overlay at that landmark
+def overlay_angles():
+    return [
+        (angle["name"], angle_key_name(angle["name"]))
+        for angle in ANGLES
+        if angle["name"] in LANDMARK_NAMES
+    ]
+
+
 def angle2d_key_name(name):
     return f"ANGLE2D_{name}"
 
 
+# a state with every key set, movements files are checked against it before they are used
+def sample_state():
+    state = {}
+    for name in LANDMARK_NAMES:
+        state[name] = get_landmark_coordinates((0, 0, 0, 0), (0, 0, 0, 0))
+    for name in (
+        [angle_key_name(angle["name"]) for angle in ANGLES]
+        + [slope_key_name(slope["name"]) for slope in SLOPES]
+        + [angle2d_key_name(angle["name"]) for angle in ANGLES2D]
+        + [other["name"] for other in OTHERS]
+    ):
+        state[name] = 0.0
+    return state
+
+
 class BodyState:
-    def __init__(self, body_config, events_config, mouse_thread):
+    def __init__(
+        self, body_config, events_config, mouse_thread, scheduler, output, latency
+    ):
         self.draw_angles = body_config["draw_angles"]
+        self.draw_landmarks = body_config["draw_landmarks"]
+        self.draw_connections = body_config["draw_connections"]
+        self.draw_face_direction = body_config["draw_face_direction"]
+        self.draw_hud = body_config["draw_hud"]
+
+        # analog camera: head angles drive the mouse speed instead of the face_* movements
+        self.analog_camera = body_config["analog_camera"]
+        self.analog_deadzone = body_config["analog_deadzone"]
+        self.analog_max_angle = body_config["analog_max_angle"]
+        self.analog_curve = body_config["analog_curve"]
+        self.analog_center_x = body_config["analog_center_x"]
 
         self.movements = Movements(movements_config=deepcopy(default_movements_config))
-        self.events = Events(**events_config, mouse_thread=mouse_thread)
+        self.events = Events(
+            **events_config,
+            mouse_thread=mouse_thread,
+            scheduler=scheduler,
+            output=output,
+            latency=latency,
+        )
+
+        # other gesture sources, each returns [(movement name, movement type), ...] per frame
+        self.trajectories = TrajectoryMatcher.from_directory(
+            body_config.get("trajectory_templates_dir", None)
+        )
+        self.gesture_sources = [self.trajectories]
+        self.classifier = ClassifierSource.from_file(
+            body_config.get("classifier_model", None)
+        )
+        if self.classifier:
+            self.gesture_sources.append(self.classifier)
+
+        # raw landmarks of the current frame: x, y, z, visibility
+        self.pose_array = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+        self.world_array = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+        self.face_nose = None  # normalized nose tip (x, y) for the face direction overlay
 
         self.state = {}
         self.init_state()
@@ -129,20 +193,67 @@ class BodyState:
     def __getitem__(self, key):
         return getattr(self, key)
 
-    def calculate(self, image, results, timestamp):
+    # Release inputs and forget gesture progress, before the frame clock restarts
+    def reset(self):
+        self.events.reset()
+        self.movements.reset_states()
+        for matcher in self.trajectories.matchers:
+            matcher.reset()
+
+    # Swap in new movement definitions between frames, keeping checkpoint states
+    def reload_movements(self, movements_config: dict, custom_movements: list):
+        movements = Movements(movements_config, custom_movements)
+        movements.inherit_states(self.movements)
+        self.movements = movements
+
+    def calculate(self, image, results, timestamp, trace=None):
         try:
             if not results.pose_landmarks or not results.pose_world_landmarks:
-                return
+                POSE_FRAMES.labels("false").inc()
+                self.pose_lost()
+                return False
+            POSE_FRAMES.labels("true").inc()
 
             self.update_state(results, image)
+            self.process_state(timestamp, trace)
 
-            self.detect_movement(timestamp)
+            return True
 
-            if self.draw_angles:
-                self.run_draw_angles(image)
+        except Exception:
+            print(traceback.format_exc())
+            self.pose_lost()
+            return False
+
+    # Same as calculate() from landmark arrays (recordings, synthetic poses), without mediapipe
+    def calculate_arrays(self, pose, world, timestamp, face_direction=(0, 0), trace=None):
+        try:
+            POSE_FRAMES.labels("true").inc()
+
+            self.update_state_arrays(pose, world, face_direction)
+            self.process_state(timestamp, trace)
+
+            return True
 
         except Exception:
             print(traceback.format_exc())
+            self.pose_lost()
+            return False
+
+    # No pose this frame: stop the head driven camera instead of keeping its last speed
+    def pose_lost(self):
+        input_state = self.events.input_state
+        input_state.clear(ANALOG_CAMERA_OWNER)
+        input_state.apply()
+
+    # Movements and inputs of the current state
+    def process_state(self, timestamp, trace=None):
+        if trace:
+            trace.state = time.perf_counter()
+        self.events.trace = trace
+
+        self.detect_movement(timestamp)
+        self.update_analog_camera()
+        self.events.flush()
 
     def init_state(self):
         for name in LANDMARK_NAMES:
@@ -164,13 +275,43 @@ class BodyState:
         pose_landmarks = results.pose_landmarks.landmark
         world_landmarks = results.pose_world_landmarks.landmark
 
-        # Caculate face direction
-        self.state["FACE_DIRECTION_X"], self.state["FACE_DIRECTION_Y"], image = caculate_face_direction(results, image)
+        for i, landmark in enumerate(pose_landmarks):
+            self.pose_array[i] = (landmark.x, landmark.y, landmark.z, landmark.visibility)
+        for i, landmark in enumerate(world_landmarks):
+            self.world_array[i] = (landmark.x, landmark.y, landmark.z, landmark.visibility)
 
-        # Get coordinates
-        for name in LANDMARK_NAMES:
+        # Caculate face direction
+        # the direction line is drawn by the overlay at preview resolution
+        self.state["FACE_DIRECTION_X"], self.state["FACE_DIRECTION_Y"], image = caculate_face_direction(results, image, is_debugging=False)
+        if results.face_landmarks:
+            nose = results.face_landmarks.landmark[1]
+            self.face_nose = (nose.x, nose.y)
+        else:
+            self.face_nose = None
+
+        self.update_features()
+
+    # pose / world: (33, 4) x, y, z, visibility; face_direction: (x, y) degrees
+    # landmark sources may have filled pose_array / world_array in place already
+    def update_state_arrays(self, pose, world, face_direction=(0, 0)):
+        if pose is not self.pose_array:
+            self.pose_array[:] = pose
+        if world is not self.world_array:
+            self.world_array[:] = world
+        self.state["FACE_DIRECTION_X"], self.state["FACE_DIRECTION_Y"] = face_direction
+        self.face_nose = None
+
+        self.update_features()
+
+    # Landmark coordinates, angles and slopes from pose_array and world_array
+    def update_features(self):
+        pose_values = self.pose_array.tolist()
+        world_values = self.world_array.tolist()
+
+        # Get coordinates, the dicts are reused between frames
+        for name, index in LANDMARK_INDEXES:
             self.state[name] = get_landmark_coordinates(
-                pose_landmarks, world_landmarks, getattr(mp_pose.PoseLandmark, name)
+                pose_values[index], world_values[index], self.state[name]
             )
 
         # Calculate angles
@@ -238,10 +379,13 @@ class BodyState:
 
     def detect_movement(self, timestamp):
         # ignore the movements by checking command key mappings
-        ignored_movement_names = []
+        ignored_movement_names = set()
         for command_name, command_value in self.events.command_key_mappings.items():
             if not command_value.get("active", True):
-                ignored_movement_names.append(command_name)
+                ignored_movement_names.add(command_name)
+
+        if self.analog_camera:
+            ignored_movement_names.update(get_separated_movements_by_name("face_left")["group"])
 
         # 取得動作條件串列
         movements = self.movements.get_current_list()
@@ -271,11 +415,10 @@ class BodyState:
 
                     # if all checkpoints are passed, add the movement to the pipeline
                     if i == len(checkpoints) - 1 and all(
-                        [
-                            checkpoint.get("state", False)
-                            for checkpoint in checkpoints
-                        ]
+                        checkpoint.get("state", False)
+                        for checkpoint in checkpoints
                     ):
+                        GESTURES_DETECTED.labels(name).inc()
                         self.events.add(
                             command_name=name,
                             command_type=movement_type,
@@ -285,7 +428,7 @@ class BodyState:
                         # ignore the movements
                         ignored_movements = get_separated_movements_by_name(name)
                         if ignored_movements:
-                            ignored_movement_names += ignored_movements["group"]
+                            ignored_movement_names.update(ignored_movements["group"])
                                 
                 # 若條件不符合 且 現在時間 - 上次觸發時間 > 條件持續時間
                 if (
@@ -295,7 +438,43 @@ class BodyState:
                 ):
                     checkpoint["state"] = False
 
-        
+        # 其他動作來源 (trajectory templates, classifier)
+        for source in self.gesture_sources:
+            for name, movement_type in source.detect(self, timestamp):
+                if name in ignored_movement_names:
+                    continue
+
+                GESTURES_DETECTED.labels(name).inc()
+                self.events.add(
+                    command_name=name,
+                    command_type=movement_type,
+                    timestamp=timestamp,
+                )
+
+                ignored_movements = get_separated_movements_by_name(name)
+                if ignored_movements:
+                    ignored_movement_names.update(ignored_movements["group"])
+
+    def update_analog_camera(self):
+        input_state = self.events.input_state
+        if not self.analog_camera or not self.events.keyboard_enabled:
+            input_state.clear(ANALOG_CAMERA_OWNER)
+            return
+
+        direction = face_to_mouse_direction(
+            self.state["FACE_DIRECTION_X"],
+            self.state["FACE_DIRECTION_Y"],
+            self.analog_deadzone,
+            self.analog_max_angle,
+            self.analog_curve,
+            center_x=self.analog_center_x,
+        )
+        input_state.set(
+            ANALOG_CAMERA_OWNER,
+            mouse_move=direction,
+            origin=InputOrigin("face_direction", self.events.trace),
+        )
+
     def debug_checkpoint_state(self,checkpoints):
         for i, checkpoint in enumerate(checkpoints):
             if(checkpoint["state"] != None):
@@ -303,54 +482,36 @@ class BodyState:
             else:
                 print("none state")
 
-    def run_draw_angles(self, image):
-        for angle in ANGLES:
-            if angle["name"] not in self.state:
-                continue
-
-            angle_value = self.state[angle_key_name(angle["name"])]
-            if not angle_value:
-                continue
-
-            landmark = self.state[angle["name"]]["pose"]
-            cv2.putText(
-                image,
-                str(round(angle_value, None)),
-                tuple(np.multiply(landmark[:2], [640, 480]).astype(int)),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (255, 255, 255),
-                2,
-                cv2.LINE_AA,
-            )
-
-    def get_logs(self):
-        logs = ""
-        """
-        for name in LANDMARK_NAMES:
-            landmark = self.state[name]
-            logs += f"{name}: {log_landmark(landmark['pose'])}\n"
-        """
+    # (name, value) rows shown in the logs window
+    def get_log_rows(self):
+        rows = []
         for angle in ANGLES:
             angle_value = self.state[angle_key_name(angle["name"])]
-            logs += f"{angle_key_name(angle['name'])}: {log_angle(angle_value)}\n"
+            rows.append((angle_key_name(angle["name"]), log_angle(angle_value)))
 
         for slope in SLOPES:
             slope_value = self.state[slope_key_name(slope["name"])]
-            logs += f"{slope_key_name(slope['name'])}: {log_angle(slope_value)}\n"
+            rows.append((slope_key_name(slope["name"]), log_angle(slope_value)))
 
         for angle2d in ANGLES2D:
             angle2d_value = self.state[angle2d_key_name(angle2d["name"])]
-            logs += f"{angle2d_key_name(angle2d['name'])}: {log_angle(angle2d_value)}\n"
+            rows.append((angle2d_key_name(angle2d["name"]), log_angle(angle2d_value)))
 
         for other in OTHERS:
-            other_value = self.state[other["name"]]
-            logs += f"{other["name"]}: {other_value}\n"
+            rows.append((other["name"], log_angle(self.state[other["name"]])))
 
-        return f"""{logs}
-        Keyboard: {'YES' if self.events.keyboard_enabled else 'NO'}
-        {self.events}
-        """
+        if self.trajectories.templates:
+            rows.append(("TRAJECTORIES", str(self.trajectories)))
+
+        if self.classifier:
+            rows.append(("CLASSIFIER", str(self.classifier)))
+
+        rows.append(("Keyboard", "YES" if self.events.keyboard_enabled else "NO"))
+        rows += self.events.get_log_rows()
+        return rows
+
+    def get_logs(self):
+        return "\n".join(f"{name}: {value}" for name, value in self.get_log_rows())
 
     def __str__(self):
         return self.get_logs()
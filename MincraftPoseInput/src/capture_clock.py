@@ -0,0 +1,120 @@
+import time
+import cv2
+from .stats import Histogram
+
+# driver timestamps are trusted after this many consistent frames
+DRIVER_TRUST_FRAMES = 30
+# max mean difference (ms) between driver and host frame intervals to trust the driver
+DRIVER_MAX_INTERVAL_ERROR = 4.0
+
+
+class CaptureClock:
+    """
+    Timestamps frames with a monotonic host clock taken when the frame is grabbed.
+    With source "auto", the driver timestamp (CAP_PROP_POS_MSEC) is used once it has
+    been increasing and consistent with the host clock for a while, mapped onto the
+    host timeline so timestamps stay continuous. Timestamps are ms since start().
+    """
+
+    def __init__(self, source: str = "auto"):
+        self.source = source  # "host", "driver" or "auto"
+        self.interval = Histogram()  # host ms between frames
+        self.jitter = Histogram()  # |host interval - mean interval| ms
+        self.start()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.interval.reset()
+        self.jitter.reset()
+        self.using_driver = False
+        self.driver_offset = 0.0
+        self.drift = 0.0  # driver elapsed - host elapsed (ms)
+        self.non_monotonic = 0
+        self.consistent_frames = 0
+        self.interval_error = 0.0
+
+        self.last_host = None
+        self.last_driver = None
+        self.last_timestamp = None
+        self.first_host = None
+        self.first_driver = None
+
+    # Returns (success, image, timestamp ms, perf_counter at grab)
+    def read(self, cap):
+        if not cap.grab():
+            return False, None, None, None
+        captured = time.perf_counter()
+        success, image = cap.retrieve()
+        if not success:
+            return False, None, None, None
+
+        driver = cap.get(cv2.CAP_PROP_POS_MSEC) if self.source != "host" else 0
+        return True, image, self.stamp(captured, driver), captured
+
+    def stamp(self, captured, driver):
+        host = (captured - self.start_time) * 1000
+        driver_valid = driver and driver > 0
+
+        if self.last_host is not None:
+            interval = host - self.last_host
+            self.interval.observe(interval)
+            self.jitter.observe(abs(interval - self.interval.mean))
+
+        if driver_valid:
+            if self.first_driver is None:
+                self.first_driver, self.first_host = driver, host
+            self.drift = (driver - self.first_driver) - (host - self.first_host)
+
+            if self.last_driver is not None and self.last_host is not None:
+                if driver <= self.last_driver:
+                    self.non_monotonic += 1
+                    self.consistent_frames = 0
+                    self.using_driver = False
+                    self.first_driver, self.first_host = driver, host
+                else:
+                    error = abs((driver - self.last_driver) - (host - self.last_host))
+                    # running mean of the interval error
+                    self.interval_error += (error - self.interval_error) * 0.1
+                    self.consistent_frames += 1
+            self.last_driver = driver
+        else:
+            self.consistent_frames = 0
+            self.using_driver = False
+            self.first_driver = self.last_driver = None
+        self.last_host = host
+
+        trust_driver = (
+            self.source == "driver"
+            or self.source == "auto"
+            and self.consistent_frames >= DRIVER_TRUST_FRAMES
+            and self.interval_error < DRIVER_MAX_INTERVAL_ERROR
+        )
+        if driver_valid and trust_driver:
+            if not self.using_driver:
+                # continue from the current host time
+                self.driver_offset = host - driver
+                self.using_driver = True
+            timestamp = driver + self.driver_offset
+        else:
+            self.using_driver = False
+            timestamp = host
+
+        # never go back in time
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            timestamp = self.last_timestamp
+        self.last_timestamp = timestamp
+        return timestamp
+
+    @property
+    def fps(self):
+        return 1000 / self.interval.mean if self.interval.mean else 0.0
+
+    def get_log_rows(self):
+        return [
+            ("Clock", f"{'driver' if self.using_driver else 'host'}, {self.fps:.1f} fps"),
+            ("Clock drift", f"{self.drift:.1f} ms, non-monotonic {self.non_monotonic}"),
+            ("Frame jitter", str(self.jitter)),
+        ]
+
+    def __str__(self):
+        return "\n".join(f"{name}: {value}" for name, value in self.get_log_rows())
@@ -0,0 +1,320 @@
+import argparse
+import os
+import numpy as np
+from .utils import (
+    POSE_LANDMARKS_COUNT,
+    LEFT_SHOULDER_INDEX,
+    RIGHT_SHOULDER_INDEX,
+    LEFT_HIP_INDEX,
+    RIGHT_HIP_INDEX,
+)
+
+# normalised pose x/y + normalised world x/y/z + face direction x/y
+FEATURES_COUNT = POSE_LANDMARKS_COUNT * 2 + POSE_LANDMARKS_COUNT * 3 + 2
+
+BACKGROUND_LABEL = ""  # frames without a movement
+DEFAULT_MIN_CONFIDENCE = 0.7
+DEFAULT_MIN_FRAMES = 3  # same prediction in a row before emitting it
+DEFAULT_MOVEMENT_TYPE = "click"
+
+
+def body_scale(array):
+    scale = np.linalg.norm(
+        array[LEFT_SHOULDER_INDEX, :2] - array[RIGHT_SHOULDER_INDEX, :2]
+    )
+    return scale if scale > 1e-6 else 1.0
+
+
+# Fills `out` with the feature vector of one frame, invariant to position and body size
+def pose_features(pose_array, world_array, face, out=None):
+    if out is None:
+        out = np.empty(FEATURES_COUNT, dtype=np.float32)
+
+    pose_end = POSE_LANDMARKS_COUNT * 2
+    world_end = pose_end + POSE_LANDMARKS_COUNT * 3
+
+    center = (pose_array[LEFT_HIP_INDEX, :2] + pose_array[RIGHT_HIP_INDEX, :2]) / 2
+    pose = out[:pose_end].reshape(POSE_LANDMARKS_COUNT, 2)
+    np.subtract(pose_array[:, :2], center, out=pose)
+    pose /= body_scale(pose_array)
+
+    # world landmarks are already centered on the hips
+    world = out[pose_end:world_end].reshape(POSE_LANDMARKS_COUNT, 3)
+    np.divide(world_array[:, :3], body_scale(world_array), out=world)
+
+    out[world_end] = face[0] / 90
+    out[world_end + 1] = face[1] / 90
+    return out
+
+
+class GestureModel:
+    """
+    kind "logistic": softmax regression, weights (features, labels) and bias (labels,)
+    kind "knn": standardised training samples (N, features) and their label indices (N,)
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        labels: list,
+        types: list,
+        mean: np.ndarray,
+        std: np.ndarray,
+        weights: np.ndarray = None,
+        bias: np.ndarray = None,
+        samples: np.ndarray = None,
+        sample_labels: np.ndarray = None,
+        k: int = 5,
+    ):
+        self.kind = kind
+        self.labels = list(labels)
+        self.types = list(types)
+        self.mean = mean.astype(np.float32)
+        self.std = std.astype(np.float32)
+        self.weights = None if weights is None else weights.astype(np.float32)
+        self.bias = None if bias is None else bias.astype(np.float32)
+        self.samples = None if samples is None else samples.astype(np.float32)
+        self.sample_labels = sample_labels
+        self.k = k
+
+        self.standardised = np.empty(FEATURES_COUNT, dtype=np.float32)
+        self.probabilities = np.empty(len(self.labels), dtype=np.float32)
+        if self.kind == "knn":
+            self.distances = np.empty(len(self.samples), dtype=np.float32)
+            self.samples_norm = np.einsum("ij,ij->i", self.samples, self.samples)
+
+    def predict(self, features: np.ndarray):
+        """Returns (label index, probability)"""
+        x = self.standardised
+        np.subtract(features, self.mean, out=x)
+        x /= self.std
+
+        p = self.probabilities
+        if self.kind == "logistic":
+            np.dot(x, self.weights, out=p)
+            p += self.bias
+            p -= p.max()
+            np.exp(p, out=p)
+            p /= p.sum()
+        else:
+            # |s - x|^2 without the constant |x|^2 term
+            np.dot(self.samples, x, out=self.distances)
+            self.distances *= -2
+            self.distances += self.samples_norm
+            k = min(self.k, len(self.distances))
+            nearest = np.argpartition(self.distances, k - 1)[:k]
+            p[:] = 0
+            np.add.at(p, self.sample_labels[nearest], 1.0 / k)
+
+        index = int(p.argmax())
+        return index, float(p[index])
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = dict(
+            kind=self.kind,
+            labels=np.array(self.labels, dtype=str),
+            types=np.array(self.types, dtype=str),
+            mean=self.mean,
+            std=self.std,
+            k=self.k,
+        )
+        if self.kind == "logistic":
+            data.update(weights=self.weights, bias=self.bias)
+        else:
+            data.update(samples=self.samples, sample_labels=self.sample_labels)
+        np.savez_compressed(path, **data)
+
+    @classmethod
+    def load(cls, path: str):
+        data = np.load(path)
+        kind = str(data["kind"])
+        return cls(
+            kind=kind,
+            labels=[str(label) for label in data["labels"]],
+            types=[str(t) for t in data["types"]],
+            mean=data["mean"],
+            std=data["std"],
+            weights=data["weights"] if kind == "logistic" else None,
+            bias=data["bias"] if kind == "logistic" else None,
+            samples=data["samples"] if kind == "knn" else None,
+            sample_labels=data["sample_labels"] if kind == "knn" else None,
+            k=int(data["k"]),
+        )
+
+
+class ClassifierSource:
+    def __init__(
+        self,
+        model: GestureModel,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        min_frames: int = DEFAULT_MIN_FRAMES,
+    ):
+        self.model = model
+        self.min_confidence = min_confidence
+        self.min_frames = min_frames
+
+        self.features = np.empty(FEATURES_COUNT, dtype=np.float32)
+        self.last_index = None
+        self.repeated = 0
+        self.prediction = None
+
+    @classmethod
+    def from_file(cls, path: str):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(GestureModel.load(path))
+        except Exception as e:
+            print(f"failed to load gesture classifier {path}: {e}")
+            return None
+
+    # Gesture source: returns [(movement name, movement type)] when a movement is recognised
+    def detect(self, body, timestamp):
+        face = (
+            body.state["FACE_DIRECTION_X"] or 0,
+            body.state["FACE_DIRECTION_Y"] or 0,
+        )
+        pose_features(body.pose_array, body.world_array, face, out=self.features)
+        index, probability = self.model.predict(self.features)
+
+        if probability < self.min_confidence:
+            index = None
+        self.repeated = self.repeated + 1 if index == self.last_index else 1
+        self.last_index = index
+
+        label = None if index is None else self.model.labels[index]
+        self.prediction = (label, probability)
+        if label in (None, BACKGROUND_LABEL) or self.repeated < self.min_frames:
+            return []
+        return [(label, self.model.types[index])]
+
+    def __str__(self):
+        if not self.prediction or self.prediction[0] is None:
+            return "-"
+        label, probability = self.prediction
+        return f"{label or 'none'} ({probability:.2f})"
+
+
+def load_recordings(paths: list):
+    features = []
+    labels = []
+    for path in paths:
+        # "session.npz:walk_forward" labels every frame of the file
+        file_label = None
+        if ":" in os.path.basename(path):
+            path, file_label = path.rsplit(":", 1)
+
+        session = np.load(path)
+        frame_labels = session["label"] if "label" in session else None
+        for i in range(len(session["timestamp"])):
+            features.append(
+                pose_features(session["pose"][i], session["world"][i], session["face"][i])
+            )
+            if file_label is not None:
+                labels.append(file_label)
+            elif frame_labels is not None:
+                labels.append(str(frame_labels[i]))
+            else:
+                labels.append(BACKGROUND_LABEL)
+
+    return np.array(features, dtype=np.float32), labels
+
+
+def train_logistic(x, y, classes, epochs, learning_rate, l2):
+    weights = np.zeros((x.shape[1], classes), dtype=np.float32)
+    bias = np.zeros(classes, dtype=np.float32)
+    one_hot = np.eye(classes, dtype=np.float32)[y]
+
+    for _ in range(epochs):
+        logits = x @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        p /= p.sum(axis=1, keepdims=True)
+
+        error = (p - one_hot) / len(x)
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+
+    return weights, bias
+
+
+def train(args):
+    x, labels = load_recordings(args.recordings)
+    if not len(x):
+        print("no frames in the recordings")
+        return
+
+    label_names = sorted(set(labels))
+    y = np.array([label_names.index(label) for label in labels])
+    types = dict(t.split("=", 1) for t in args.types)
+    movement_types = [types.get(label, DEFAULT_MOVEMENT_TYPE) for label in label_names]
+
+    mean = x.mean(axis=0)
+    std = x.std(axis=0) + 1e-6
+    x = (x - mean) / std
+
+    if args.kind == "logistic":
+        weights, bias = train_logistic(
+            x, y, len(label_names), args.epochs, args.learning_rate, args.l2
+        )
+        model = GestureModel(
+            "logistic", label_names, movement_types, mean, std, weights=weights, bias=bias
+        )
+    else:
+        # keep at most max_samples per label so inference stays in budget
+        rng = np.random.default_rng(0)
+        keep = []
+        for index in range(len(label_names)):
+            rows = np.flatnonzero(y == index)
+            if len(rows) > args.max_samples:
+                rows = rng.choice(rows, args.max_samples, replace=False)
+            keep.extend(rows)
+        keep = np.array(sorted(keep))
+        model = GestureModel(
+            "knn",
+            label_names,
+            movement_types,
+            mean,
+            std,
+            samples=x[keep],
+            sample_labels=y[keep],
+            k=args.k,
+        )
+
+    accuracy = np.mean(
+        [model.predict(row * std + mean)[0] == label for row, label in zip(x, y)]
+    )
+    for index, label in enumerate(label_names):
+        print(f"{label or '(none)'}: {np.sum(y == index)} frames, {movement_types[index]}")
+    print(f"training accuracy: {accuracy:.3f}")
+
+    model.save(args.output)
+    print(f"saved model to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Train the gesture classifier from recorded sessions"
+    )
+    parser.add_argument(
+        "recordings",
+        nargs="+",
+        help="recorded sessions (.npz), append :label to label the whole file",
+    )
+    parser.add_argument("-o", "--output", default="models/gestures.npz")
+    parser.add_argument("--kind", choices=("logistic", "knn"), default="logistic")
+    parser.add_argument(
+        "--types",
+        nargs="*",
+        default=[],
+        help="command type per label, e.g. walk_forward=hold (default click)",
+    )
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-samples", type=int, default=300)
+    train(parser.parse_args())
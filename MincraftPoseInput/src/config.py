@@ -1,4 +1,3 @@
-import mediapipe as mp
 import json
 import os
 
@@ -12,6 +11,24 @@ IMAGE_HEIGHT = 480
 
 auto_start_camera = False
 
+# Publish gesture decisions and inputs as JSON lines for other apps (see src/event_stream.py),
+# "tcp://127.0.0.1:5011" or "unix:///tmp/motionmap-events.sock", None to disable
+event_stream_address = None
+
+# Serve the metrics registry on http://127.0.0.1:<port>/metrics (Prometheus text format), None to disable
+metrics_port = None
+
+# Per-stage tracemalloc allocations in the logs window, slows the frame loop down
+track_allocations = False
+
+# "Capture profile" button: sampling profiler duration and sample interval (seconds)
+profile_duration = 10
+profile_interval = 0.005
+
+# Frame timestamps: "host" monotonic clock at grab, "driver" CAP_PROP_POS_MSEC, or "auto"
+# (driver once it proved monotonic and consistent with the host clock)
+capture_clock_source = "auto"
+
 # Config for mediapipe pose solution
 default_mp_config = dict(
     min_detection_confidence=0.5,
@@ -23,6 +40,39 @@ default_mp_config = dict(
 # Config for body processor
 default_body_config = dict(
     draw_angles=True,  # Show calculated angles on camera
+    draw_landmarks=True,  # Show pose landmarks on camera
+    draw_connections=True,  # Show lines between pose landmarks on camera
+    draw_face_direction=True,  # Show the face direction line on camera
+    draw_hud=False,  # Show the performance overlay on camera
+    movements_file="movements.json",  # thresholds and custom movements, reloaded when changed
+    trajectory_templates_dir="templates",  # recorded trajectory templates (.npz), see src/trajectory.py
+    classifier_model="models/gestures.npz",  # trained gesture classifier, see src/classifier.py
+    analog_camera=False,  # head angles move the camera proportionally instead of face_* movements
+    analog_deadzone=5,  # degrees around the center ignored
+    analog_max_angle=25,  # degrees for full speed
+    analog_curve=1.5,  # response curve exponent, 1: linear
+    analog_center_x=5,  # resting head pitch (degrees)
+)
+
+# Where keyboard/mouse inputs go: "pynput" (the OS) or "recording" (in memory, headless)
+default_input_backend = "pynput"
+
+# Where the app and the headless runner get landmarks (see src/landmark_sources.py): "mediapipe"
+# (camera + inference in process), "socket" (src/remote.py frames) or "shared_memory" (another tracker)
+default_landmark_source = dict(
+    type="mediapipe",
+    transport="udp",  # socket
+    host="127.0.0.1",  # socket
+    port=5005,  # socket
+    shared_memory_name="motionmap_landmarks",  # shared_memory
+    mapping=None,  # {"NOSE": 0, "LEFT_SHOULDER": 5, ...} source index of each landmark, None: mediapipe order
+)
+
+# Config for the mouse mover used by mouse_move commands
+default_mouse_config = dict(
+    speed=300,  # px per second for a unit direction
+    rate=120,  # mouse updates per second while moving
+    smoothing=0.05,  # seconds to reach a new direction, interpolates between camera frames
 )
 
 default_pressing_timer_interval = dict(
@@ -96,6 +146,9 @@ class AppConfig:
         self.mp_config = default_mp_config
         self.body_config = default_body_config
         self.events_config = default_events_config
+        self.mouse_config = default_mouse_config
+        self.input_backend = default_input_backend
+        self.landmark_source = default_landmark_source
         self.controls_list = default_controls_list
 
     def get_config_fields(self):
@@ -113,6 +166,61 @@ class AppConfig:
                 input="checkbox",
                 description="Show calculated angles on camera",
             ),
+            dict(
+                name="Show body landmarks",
+                key="draw_landmarks",
+                type="body",
+                input="checkbox",
+                description="Show detected pose landmarks on camera",
+            ),
+            dict(
+                name="Show body connections",
+                key="draw_connections",
+                type="body",
+                input="checkbox",
+                description="Show lines between pose landmarks on camera",
+            ),
+            dict(
+                name="Show face direction",
+                key="draw_face_direction",
+                type="body",
+                input="checkbox",
+                description="Show the detected face direction on camera",
+            ),
+            dict(
+                name="Show performance overlay",
+                key="draw_hud",
+                type="body",
+                input="checkbox",
+                description="Show fps, time per stage, dropped frames and the last command latency on camera",
+            ),
+            dict(
+                name="Analog camera",
+                key="analog_camera",
+                type="body",
+                input="checkbox",
+                description="Turn the camera proportionally to the head angle instead of at a constant speed",
+            ),
+            dict(
+                name="Analog camera deadzone",
+                key="analog_deadzone",
+                type="body",
+                input="slider",
+                min=0,
+                max=15,
+                value=self.body_config["analog_deadzone"],
+                description="Head angle (degrees) ignored around the center",
+            ),
+            dict(
+                name="Analog camera curve",
+                key="analog_curve",
+                type="body",
+                input="slider_percentage",
+                min=100,
+                max=300,
+                value=self.body_config["analog_curve"] * 100,
+                description="Response curve: 100 is linear, higher values are finer near the center",
+            ),
             dict(
                 name="Advanced settings (require restart the camera to apply, hover for more info)",
                 input="label",
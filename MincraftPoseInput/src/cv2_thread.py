@@ -1,24 +1,38 @@
-import traceback
+import time
+import threading
+from dataclasses import dataclass
 import cv2
 import numpy as np
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import QThread, Signal
 from PySide6.QtGui import QImage
-import mediapipe as mp
-from .body import BodyState
+from .body import overlay_angles
 from .config import IMAGE_HEIGHT, IMAGE_WIDTH, AppConfig
-from .mouse_thread import MouseThread
+from .pipeline import BG_COLOR, GesturePipeline, create_holistic
+from .landmark_sources import create_landmark_source
+from .hud import PerfHud
+from .overlay import OverlayRenderer
+from .logs import LOGS_REFRESH_INTERVAL
+from . import metrics
+from .tracing import TRACER
 
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
-mp_holistic = mp.solutions.holistic
 
-BG_COLOR = (192, 192, 192)  # gray
+@dataclass(frozen=True)
+class FrameResult:
+    """Everything the GUI needs from one processed frame."""
+
+    image: QImage
+    timestamp: float
+    # (name, value) rows of the capture clock and the body state, taken on the camera
+    # thread so the GUI never reads state that the next frame is changing. Only taken
+    # while the logs window is shown, the last rows are reused in between
+    log_rows: tuple
 
 
 class Cv2Thread(QThread):
+    # emitted on loading/running transitions only
     update_status = Signal(dict)
-    update_frame = Signal(QImage)
-    update_state = Signal(dict)
+    # a new FrameResult is pending, read it with take_frame()
+    frame_ready = Signal()
 
     def __init__(
         self,
@@ -27,101 +41,172 @@ class Cv2Thread(QThread):
     ):
         QThread.__init__(self, parent)
         self.status = False
+        self.loading = False
         self.cap = None
-        self.mouse_thread = MouseThread()
-        self.body = BodyState(app_config.body_config, app_config.events_config, self.mouse_thread)
-        self.mp_config = app_config.mp_config
+
+        # newest frame not yet taken by the GUI, older ones are dropped
+        self.pending_lock = threading.Lock()
+        self.pending_frame = None
+        self.stale_frames = 0
+        self.pipeline = GesturePipeline(app_config)
+        self.body = self.pipeline.body
+        self.output = self.pipeline.output
+        self.latency = self.pipeline.latency
+        self.recorder = self.pipeline.recorder
+        self.capture_clock = self.pipeline.capture_clock
+        self.allocations = self.pipeline.allocations
+        self.mp_config = self.pipeline.mp_config
+        self.landmark_source = app_config.landmark_source
         self.camera_port = 0
+        # preview background of external landmark sources, there is no camera image
+        self.blank_image = np.full((IMAGE_HEIGHT, IMAGE_WIDTH, 3), BG_COLOR, dtype=np.uint8)
+        self.hud = PerfHud()
+        self.pipeline.hud = self.hud
+        self.overlay = OverlayRenderer(overlay_angles())
+        # log rows are only formatted while the logs window shows them, at its refresh rate
+        self.log_rows_wanted = False
+        self.log_rows = ()
+        self.log_rows_time = 0.0
 
     def toggle(self):
         self.status = not self.status
         if self.status:
-            self.mouse_thread.start()
+            self.pipeline.start()
             self.start()
         else:
-            self.mouse_thread.requestInterruption()
-            self.mouse_thread.wait()
+            self.pipeline.stop()
+
+    def set_loading(self, loading: bool):
+        if loading != self.loading:
+            self.loading = loading
+            self.update_status.emit(dict(loading=loading))
+
+    def publish_frame(self, frame: FrameResult):
+        with self.pending_lock:
+            notify = self.pending_frame is None
+            if not notify:
+                self.stale_frames += 1
+                metrics.FRAMES.labels("dropped").inc()
+            self.pending_frame = frame
+        # only one queued signal at a time, however far behind the GUI is
+        if notify:
+            self.frame_ready.emit()
+
+    # Rows of the clock and the body state, reused between logs refreshes
+    def take_log_rows(self, now):
+        if self.log_rows_wanted and now - self.log_rows_time >= LOGS_REFRESH_INTERVAL / 1000:
+            self.log_rows_time = now
+            self.log_rows = tuple(self.capture_clock.get_log_rows() + self.body.get_log_rows())
+        return self.log_rows
+
+    def take_frame(self):
+        with self.pending_lock:
+            frame, self.pending_frame = self.pending_frame, None
+        return frame
 
     def run(self):
+        self.set_loading(True)
+        if self.landmark_source["type"] == "mediapipe":
+            self.run_camera()
+        else:
+            self.run_source()
+
+        self.pipeline.stop()
+        self.recorder.stop()
+        self.loading = False
+        self.update_status.emit(dict(loading=False))
+
+    def run_camera(self):
         print("run mediapipe", self.mp_config)
-        self.update_status.emit(dict(loading=True))
         self.cap = cv2.VideoCapture(self.camera_port)
+        self.capture_clock.start()
 
-        with mp_holistic.Holistic(**self.mp_config) as holistic:
+        with create_holistic(self.mp_config) as holistic:
             while self.cap.isOpened() and self.status:
-                self.update_status.emit(dict(loading=False))
-                success, image = self.cap.read()
-                if not success:
-                    print("Ignoring empty camera frame.")
+                self.set_loading(False)
+                frame = self.pipeline.step(self.cap, holistic)
+                if frame is None:
                     # If loading a video, use 'break' instead of 'continue'.
                     continue
-
-                timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC)
-
-                # To improve performance, optionally mark the image as not writeable to
-                # pass by reference.
-                # Recolor image to RGB
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                image.flags.writeable = False
-
-                # Make detection
-                results = holistic.process(image)
-
-                # Recolor back to BGR
-                image.flags.writeable = True
-                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-                if (
-                    self.mp_config["enable_segmentation"]
-                    and results.segmentation_mask is not None
-                ):
-                    try:
-                        # Draw selfie segmentation on the background image.
-                        # To improve segmentation around boundaries, consider applying a joint
-                        # bilateral filter to "results.segmentation_mask" with "image".
-                        condition = (
-                            np.stack((results.segmentation_mask,) * 3, axis=-1) > 0.1
-                        )
-                        # The background can be customized.
-                        #   a) Load an image (with the same width and height of the input image) to
-                        #      be the background, e.g., bg_image = cv2.imread('/path/to/image/file')
-                        #   b) Blur the input image by applying image filtering, e.g.,
-                        #      bg_image = cv2.GaussianBlur(image,(55,55),0)
-                        bg_image = cv2.GaussianBlur(image, (55, 55), 0)
-                        if bg_image is None:
-                            bg_image = np.zeros(image.shape, dtype=np.uint8)
-                            bg_image[:] = BG_COLOR
-                        image = np.where(condition, image, bg_image)
-                    except Exception:
-                        print(traceback.format_exc())
-
-                # Draw landmark annotation on the image.
-                mp_drawing.draw_landmarks(
-                    image,
-                    results.pose_landmarks,
-                    mp_holistic.POSE_CONNECTIONS,
-                    landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style(),
-                )
-
-                self.body.calculate(image, results, timestamp)
-
-                # Reading the image in RGB to display it
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-                # Creating and scaling QImage
-                h, w, ch = image.shape
-                image = QImage(image.data, w, h, ch * w, QImage.Format_RGB888)
-                image = image.scaled(IMAGE_WIDTH, IMAGE_HEIGHT, Qt.KeepAspectRatio)
-
-                # Emit signal
-                self.update_frame.emit(image)
-                self.update_state.emit(dict(body=self.body))
+                self.show_frame(frame.image, frame.detected, frame.timestamp, frame.captured)
 
                 if cv2.waitKey(5) & 0xFF == 27:
                     break
-        
-        self.mouse_thread.requestInterruption()
-        self.mouse_thread.wait()
+
         print("stop camera")
         self.cap.release()
-        self.update_status.emit(dict(loading=False))
+
+    # Landmarks from another process or machine, the preview shows the overlay only
+    def run_source(self):
+        print("run landmark source", self.landmark_source["type"])
+        source = create_landmark_source(self.landmark_source)
+        source.start()
+        try:
+            while self.status:
+                self.set_loading(False)
+                self.allocations.begin()
+                try:
+                    frame = self.pipeline.step_source(source, timeout=0.5)
+                except EOFError:
+                    break
+                if frame is None:
+                    continue
+                self.show_frame(self.blank_image.copy(), frame.detected, frame.timestamp, frame.captured)
+        finally:
+            source.stop()
+        print("stop landmark source")
+
+    # Overlay, HUD and hand the frame to the GUI
+    def show_frame(self, image, detected, timestamp, captured):
+        stage_start = time.perf_counter()
+
+        # Scale to the preview size first, the overlay is drawn at preview resolution
+        h, w = image.shape[:2]
+        scale = min(IMAGE_WIDTH / w, IMAGE_HEIGHT / h)
+        if scale != 1:
+            image = cv2.resize(
+                image,
+                (round(w * scale), round(h * scale)),
+                interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR,
+            )
+
+        # Draw landmark annotation on the image.
+        if detected:
+            self.overlay.draw(image, self.body)
+
+        hud = self.hud
+        hud.frame_done()
+        if self.body.draw_hud:
+            hud.update_text(
+                self.capture_clock.fps,
+                self.stale_frames,
+                self.pipeline.empty_frames,
+                self.output.depth,
+                self.latency.last_input,
+            )
+            hud.draw(image)
+
+        # QImage reads the BGR frame directly, and does not own the numpy buffer, copy it
+        h, w = image.shape[:2]
+        image = QImage(image.data, w, h, image.strides[0], QImage.Format_BGR888).copy()
+        now = time.perf_counter()
+        self.pipeline.observe_stage("preview", (now - stage_start) * 1000)
+        TRACER.add("preview", "cv2", stage_start, now)
+        self.allocations.mark("preview")
+
+        metrics.FRAMES.labels("processed").inc()
+        # external sources do not know when their camera frame was grabbed
+        if captured is not None:
+            metrics.FRAME_MS.observe((now - captured) * 1000)
+        metrics.CAPTURE_FPS.set(self.capture_clock.fps)
+        metrics.OUTPUT_QUEUE_DEPTH.set(self.output.depth)
+
+        with TRACER.span("publish", "cv2"):
+            self.publish_frame(
+                FrameResult(
+                    image=image,
+                    timestamp=timestamp,
+                    log_rows=self.take_log_rows(now),
+                )
+            )
+        self.allocations.mark("publish")
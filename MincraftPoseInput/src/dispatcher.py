@@ -0,0 +1,157 @@
+import threading
+import time
+import traceback
+from collections import deque
+from .input_backend import InputBackend
+from .event_stream import EVENT_STREAM
+from .stats import Histogram
+from .tracing import TRACER
+
+# actions: (kind, value, enqueue time, InputOrigin or None)
+PRESS = "press"
+RELEASE = "release"
+MOUSE_PRESS = "mouse_press"
+MOUSE_RELEASE = "mouse_release"
+SCROLL = "scroll"
+
+DEFAULT_QUEUE_SIZE = 256
+
+
+class OutputDispatcher:
+    """
+    Runs keyboard/mouse calls on a dedicated worker thread so slow input injection
+    never stalls the inference thread. Redundant actions (pressing a key that is
+    already held, releasing one that is not) are dropped when they are queued.
+    """
+
+    def __init__(
+        self,
+        backend: InputBackend,
+        latency=None,
+        max_size: int = DEFAULT_QUEUE_SIZE,
+        verbose: bool = False,
+    ):
+        self.backend = backend
+        self.latency = latency
+        self.max_size = max_size
+        self.verbose = verbose
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+        # keys and buttons held once every queued action has run
+        self.held = set()
+
+        self.dispatch_latency = Histogram()  # enqueue -> OS call returned (ms)
+        self.max_depth = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def put(self, kind: str, value, origin=None):
+        with self.condition:
+            if kind in (PRESS, MOUSE_PRESS):
+                if (kind, value) in self.held:
+                    self.coalesced += 1
+                    return
+                # presses can be dropped, releases are always queued so nothing stays stuck
+                if len(self.queue) >= self.max_size:
+                    self.dropped += 1
+                    return
+                self.held.add((kind, value))
+            elif kind in (RELEASE, MOUSE_RELEASE):
+                pressed = (PRESS if kind == RELEASE else MOUSE_PRESS, value)
+                if pressed not in self.held:
+                    self.coalesced += 1
+                    return
+                self.held.discard(pressed)
+            elif len(self.queue) >= self.max_size:
+                self.dropped += 1
+                return
+
+            self.queue.append((kind, value, time.perf_counter(), origin))
+            if len(self.queue) > self.max_depth:
+                self.max_depth = len(self.queue)
+            self.condition.notify()
+
+    def press(self, key, origin=None):
+        self.put(PRESS, key, origin)
+
+    def release(self, key, origin=None):
+        self.put(RELEASE, key, origin)
+
+    def mouse_press(self, button, origin=None):
+        self.put(MOUSE_PRESS, button, origin)
+
+    def mouse_release(self, button, origin=None):
+        self.put(MOUSE_RELEASE, button, origin)
+
+    def scroll(self, dy, origin=None):
+        self.put(SCROLL, dy, origin)
+
+    def dispatch(self, kind, value):
+        if self.verbose:
+            print(kind, value)
+        if kind == PRESS:
+            self.backend.press(value)
+        elif kind == RELEASE:
+            self.backend.release(value)
+        elif kind == MOUSE_PRESS:
+            self.backend.mouse_press(value)
+        elif kind == MOUSE_RELEASE:
+            self.backend.mouse_release(value)
+        elif kind == SCROLL:
+            self.backend.scroll(value)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                kind, value, queued_time, origin = self.queue.popleft()
+
+            dispatch_start = time.perf_counter()
+            try:
+                self.dispatch(kind, value)
+            except Exception:
+                print(traceback.format_exc())
+            now = time.perf_counter()
+            TRACER.add("queued", "output", queued_time, dispatch_start)
+            TRACER.add(kind, "output", dispatch_start, now, dict(value=str(value)))
+            self.dispatch_latency.observe((now - queued_time) * 1000)
+            EVENT_STREAM.input(kind, value, origin)
+            if origin is not None and self.latency:
+                self.latency.input_sent(origin, now)
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, name="OutputDispatcher", daemon=True)
+        self.thread.start()
+
+    # Stop the worker once the queued actions have been sent
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    @property
+    def depth(self):
+        return len(self.queue)
+
+    def get_log_value(self):
+        return (
+            f"depth {self.depth} (max {self.max_depth}), coalesced {self.coalesced}, "
+            f"dropped {self.dropped}"
+        )
+
+    def __str__(self):
+        return f"{self.get_log_value()}\nlatency: {self.dispatch_latency}"
@@ -0,0 +1,290 @@
+"""
+Local gesture event stream for overlays, stream widgets and game integrations: every
+Events.add decision and every input sent, as JSON lines over TCP or a Unix socket.
+
+    {"event": "hello", "version": 1}
+    {"event": "gesture", "name": "jump", "type": "click", "timestamp": 1234.5, "fired": true, "time": 1760000000.123}
+    {"event": "press", "input": "space", "name": "jump", "type": "click", "time": 1760000000.124}
+    {"event": "release", "input": "space", "name": null, "type": null, "time": 1760000000.424}
+
+`timestamp` is the camera frame (ms, capture clock), `time` the wall clock (s) when the
+event happened. Press/release kinds are the OutputDispatcher ones (press, release,
+mouse_press, mouse_release, scroll).
+
+publish() only appends to a queue, a server thread encodes and fans out. Every
+subscriber has its own bounded queue: a slow one loses its oldest events (counted in
+its "dropped") without delaying the others or the inference thread. A burst faster
+than the server thread loses the oldest events of the publish queue for everyone
+(counted in "overflowed").
+
+    python -m src.event_stream tcp://127.0.0.1:5011   # print the events
+"""
+import json
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+VERSION = 1
+SUBSCRIBER_QUEUE_SIZE = 1024  # events waiting per subscriber
+PUBLISH_QUEUE_SIZE = 4096  # events not yet fanned out
+
+
+def parse_address(address: str):
+    """("tcp", (host, port)) or ("unix", path) from tcp://host:port or unix:///path"""
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://") :]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://") :].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"event stream address must be tcp://host:port or unix:///path, not {address}")
+
+
+class Subscriber:
+    __slots__ = ("sock", "name", "queue", "pending", "sent", "dropped")
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self.queue = deque()
+        self.pending = None  # memoryview of a partly sent message
+        self.sent = 0
+        self.dropped = 0
+
+
+class EventStream:
+    def __init__(self):
+        self.enabled = False
+        self.address = None
+        self.unix_path = None
+        self.events = deque(maxlen=PUBLISH_QUEUE_SIZE)
+        self.subscribers = []
+        self.thread = None
+        self.wake_pending = False
+        self.published = 0
+        self.overflowed = 0  # events pushed out of the publish queue before the fan out
+
+    def start(self, address: str):
+        if self.enabled:
+            return
+        self.address = address
+        kind, target = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            self.unix_path = target
+            self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(target)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        if kind == "tcp":
+            self.address = f"tcp://{target[0]}:{self.listener.getsockname()[1]}"
+
+        self.wake_receiver, self.wake_sender = socket.socketpair()
+        self.wake_receiver.setblocking(False)
+        self.wake_sender.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ, "accept")
+        self.selector.register(self.wake_receiver, selectors.EVENT_READ, "wake")
+
+        self.running = True
+        self.enabled = True
+        self.thread = threading.Thread(target=self.run, name="EventStream", daemon=True)
+        self.thread.start()
+        print(f"gesture events on {self.address}")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.running = False
+        self.wake()
+        self.thread.join()
+        self.thread = None
+
+    # Called from the inference and output threads, never blocks
+    def publish(self, event: dict):
+        if not self.enabled:
+            return
+        events = self.events
+        if len(events) == events.maxlen:
+            self.overflowed += 1
+        events.append(event)
+        self.published += 1
+        if not self.wake_pending:
+            self.wake_pending = True
+            self.wake()
+
+    def wake(self):
+        try:
+            self.wake_sender.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def gesture(self, name, command_type, timestamp, fired):
+        if self.enabled:
+            self.publish(
+                dict(event="gesture", name=name, type=command_type, timestamp=timestamp, fired=fired, time=time.time())
+            )
+
+    def input(self, kind, value, origin=None):
+        if self.enabled:
+            self.publish(
+                dict(
+                    event=kind,
+                    input=value if isinstance(value, (str, int, float)) else str(value),
+                    name=origin.command_name if origin else None,
+                    type=origin.command_type if origin else None,
+                    time=time.time(),
+                )
+            )
+
+    def run(self):
+        try:
+            while self.running:
+                for key, mask in self.selector.select():
+                    if key.data == "accept":
+                        self.accept()
+                    elif key.data == "wake":
+                        try:
+                            while self.wake_receiver.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                    elif mask & selectors.EVENT_READ:
+                        self.read(key.data)
+                    if mask & selectors.EVENT_WRITE and isinstance(key.data, Subscriber):
+                        self.flush(key.data)
+                # cleared before taking the events, a publish after this wakes the selector again
+                self.wake_pending = False
+                self.fan_out()
+        finally:
+            for subscriber in list(self.subscribers):
+                self.remove(subscriber)
+            self.selector.close()
+            self.listener.close()
+            self.wake_receiver.close()
+            self.wake_sender.close()
+            # the socket file would stay behind
+            if self.unix_path:
+                try:
+                    os.unlink(self.unix_path)
+                except OSError:
+                    pass
+                self.unix_path = None
+
+    def accept(self):
+        try:
+            sock, address = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        name = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else "unix"
+        subscriber = Subscriber(sock, name)
+        subscriber.queue.append(self.encode(dict(event="hello", version=VERSION)))
+        self.subscribers.append(subscriber)
+        self.selector.register(sock, selectors.EVENT_READ | selectors.EVENT_WRITE, subscriber)
+        print(f"event subscriber {name} connected")
+
+    # Subscribers do not send anything, reading only notices them leaving
+    def read(self, subscriber: Subscriber):
+        try:
+            data = subscriber.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.remove(subscriber)
+
+    def remove(self, subscriber: Subscriber):
+        if subscriber not in self.subscribers:
+            return
+        self.subscribers.remove(subscriber)
+        self.selector.unregister(subscriber.sock)
+        subscriber.sock.close()
+        print(f"event subscriber {subscriber.name} left, sent {subscriber.sent}, dropped {subscriber.dropped}")
+
+    @staticmethod
+    def encode(event):
+        return (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def fan_out(self):
+        events = self.events
+        count = 0
+        while events:
+            message = self.encode(events.popleft())
+            for subscriber in self.subscribers:
+                if len(subscriber.queue) >= SUBSCRIBER_QUEUE_SIZE:
+                    subscriber.queue.popleft()
+                    subscriber.dropped += 1
+                subscriber.queue.append(message)
+            count += 1
+            # flush before a burst fills the queues, only subscribers that cannot keep up drop
+            if count % SUBSCRIBER_QUEUE_SIZE == 0:
+                self.flush_all()
+        self.flush_all()
+
+    def flush_all(self):
+        for subscriber in list(self.subscribers):
+            self.flush(subscriber)
+
+    def flush(self, subscriber: Subscriber):
+        sock = subscriber.sock
+        try:
+            while subscriber.pending or subscriber.queue:
+                if subscriber.pending is None:
+                    subscriber.pending = memoryview(subscriber.queue.popleft())
+                sent = sock.send(subscriber.pending)
+                subscriber.pending = subscriber.pending[sent:] if sent < len(subscriber.pending) else None
+                if subscriber.pending is None:
+                    subscriber.sent += 1
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.remove(subscriber)
+            return
+        if subscriber not in self.subscribers:
+            return
+        # only wait for the socket to be writable while something is left
+        events = selectors.EVENT_READ
+        if subscriber.pending or subscriber.queue:
+            events |= selectors.EVENT_WRITE
+        if self.selector.get_key(sock).events != events:
+            self.selector.modify(sock, events, subscriber)
+
+    def get_log_rows(self):
+        if not self.enabled:
+            return []
+        subscribers = ", ".join(f"{s.name} sent {s.sent} dropped {s.dropped}" for s in list(self.subscribers))
+        return [
+            (
+                "Event stream",
+                f"{self.address}, published {self.published}, overflowed {self.overflowed}, "
+                f"{subscribers or 'no subscribers'}",
+            )
+        ]
+
+
+EVENT_STREAM = EventStream()
+
+
+if __name__ == "__main__":
+    kind, target = parse_address(sys.argv[1] if len(sys.argv) > 1 else "tcp://127.0.0.1:5011")
+    sock = socket.socket(socket.AF_UNIX if kind == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(target)
+    try:
+        for line in sock.makefile("r", encoding="utf-8"):
+            event = json.loads(line)
+            if "time" in event:
+                # wall clock delay since the event happened
+                line = line.rstrip("\n") + f"  +{(time.time() - event['time']) * 1000:.2f} ms"
+            print(line.rstrip("\n"))
+    except KeyboardInterrupt:
+        pass
@@ -1,4 +1,9 @@
+from collections import deque
 from .command import CommandProcessor
+from .event_stream import EVENT_STREAM
+from .input_state import InputState
+from .latency import InputOrigin
+from .metrics import GESTURES_FIRED, GESTURES_IGNORED
 from .movements import get_separated_movements_by_name
 
 
@@ -8,18 +13,30 @@ class Events:
         keyboard_enabled: bool,
         pressing_timer_interval: dict,
         command_key_mappings: dict,
-        mouse_thread
+        mouse_thread,
+        scheduler,
+        output,
+        latency,
     ):
         self.keyboard_enabled = keyboard_enabled
         self.command_key_mappings = command_key_mappings
         self.pressing_timer_interval = pressing_timer_interval
         self.mouse_thread = mouse_thread
+        self.scheduler = scheduler
+        self.output = output
+        self.latency = latency
+        self.input_state = InputState(self.output, self.mouse_thread)
 
-        self.history = []
+        # trace of the frame being processed, see BodyState.calculate
+        self.trace = None
+
+        self.history = deque()
 
         self.commands_map: dict[str, CommandProcessor] = dict()
         for key in self.pressing_timer_interval.keys():
-            self.commands_map[key] = CommandProcessor(self.mouse_thread)
+            self.commands_map[key] = CommandProcessor(
+                key, self.input_state, self.scheduler, self.output, self.latency
+            )
 
     def __setitem__(self, key, value):
         setattr(self, key, value)
@@ -38,18 +55,21 @@ class Events:
                     "timestamp"
                 ] < ignored_movements.get("duration", 0):
                     # print("ignore", command_name, command_type)
+                    GESTURES_IGNORED.labels(command_name).inc()
+                    EVENT_STREAM.gesture(command_name, command_type, timestamp, False)
                     return
 
-        # only keeps latest events in history from 10 seconds
-        self.history = [
-            event for event in self.history if timestamp - event["timestamp"] < 10000
-        ]
+        # only keeps latest events in history from 10 seconds (oldest first)
+        while self.history and timestamp - self.history[0]["timestamp"] >= 10000:
+            self.history.popleft()
         self.history.append(
             {"name": command_name, "timestamp": timestamp, "type": command_type}
         )
 
         # print("add command", command_name, command_type)
 
+        GESTURES_FIRED.labels(command_name, command_type).inc()
+        EVENT_STREAM.gesture(command_name, command_type, timestamp, True)
         pressing_timer_interval = self.pressing_timer_interval[command_type]
 
         self.commands_map[command_type].add_command(
@@ -57,11 +77,35 @@ class Events:
             self.keyboard_enabled,
             self.command_key_mappings,
             pressing_timer_interval,
+            origin=InputOrigin(command_type, self.trace, command_name=command_name),
         )
 
-    def __str__(self):
-        result = ""
-        for k, v in self.commands_map.items():
-            result += f"{k} ({len(v.commands)}): {v}\n"
+    # Send the input changes of this frame
+    def flush(self):
+        self.input_state.apply()
+
+    # Release every held input and forget the gesture history, the next
+    # timestamps may come from a restarted clock
+    def reset(self):
+        self.history.clear()
+        for command in self.commands_map.values():
+            if command.pressing_timer:
+                command.pressing_timer.cancel()
+            command.pressing_timer = None
+            command.pressing_key = None
+        self.input_state.reset()
 
-        return result
+    def get_log_rows(self):
+        rows = [
+            (f"{k} ({v.commands_count})", str(v).replace("\n", " / "))
+            for k, v in self.commands_map.items()
+        ]
+        rows.append(("Input", str(self.input_state)))
+        rows.append(("Release lateness", str(self.scheduler.lateness)))
+        rows.append(("Output", self.output.get_log_value()))
+        rows.append(("Output latency", str(self.output.dispatch_latency)))
+        rows += self.latency.get_log_rows()
+        return rows
+
+    def __str__(self):
+        return "\n".join(f"{name}: {value}" for name, value in self.get_log_rows())
@@ -1,9 +1,6 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 
-mp_face_mesh = mp.solutions.face_mesh
-
 def caculate_face_direction(results, image, is_debugging = True):
     img_h, img_w, img_c = image.shape
     text = ""
@@ -0,0 +1,244 @@
+"""
+Golden-session regression of the gesture pipeline: recorded landmark sessions are
+replayed through BodyState -> Events -> inputs with a fake clock and a recording
+backend, and the command stream is compared with the golden file of the session.
+
+    python -m src.golden recordings/*.npz synthetic:walk --update
+    python -m src.golden recordings/*.npz synthetic:all --tolerance 50
+
+A session is a recorded .npz (see src/recorder.py) or synthetic:<name> from
+SYNTHETIC_SESSIONS; goldens are <golden dir>/<session name>.json. Sessions run in
+parallel, one process each.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from copy import deepcopy
+from multiprocessing import Pool
+import numpy as np
+from .body import BodyState
+from .config import default_body_config, default_events_config
+from .input_backend import RecordingBackend
+from .latency import LatencyTracker
+from .movements_file import load_movements_file
+from .scheduler import InputScheduler
+from .synthetic import generate_sequence
+
+GOLDEN_DIR = "golden"
+DEFAULT_TOLERANCE_MS = 50
+
+# releases still scheduled after the last frame are run this much later (s)
+FLUSH_SECONDS = 10
+
+SYNTHETIC_SESSIONS = dict(
+    walk=[("idle", 2), ("walk", 10), ("idle", 2)],
+    swings=[("idle", 2), ("left_swing", 6), ("right_swing", 6), ("idle", 2)],
+    jump=[("idle", 2), ("jump", 9), ("idle", 2)],
+    head_turn=[("idle", 2), ("head_turn", 8), ("idle", 2)],
+    mixed=[
+        ("idle", 3), ("walk", 6), ("left_swing", 4), ("right_swing", 4),
+        ("jump", 5), ("head_turn", 4), ("walk", 4),
+    ],
+)
+
+
+class CommandRecorder:
+    """
+    OutputDispatcher and MouseThread stand-in: sends every input to the backend on the
+    calling thread and keeps which command (name, type) it came from. Releases have no
+    origin, they belong to the command that pressed the input.
+    """
+
+    def __init__(self, backend: RecordingBackend):
+        self.backend = backend
+        self.commands = []  # (name, type) of each backend event
+        self.held = {}
+
+    def send(self, kind, value, origin, held_kind=None):
+        if origin is not None:
+            command = (origin.command_name, origin.command_type)
+        elif held_kind:
+            command = self.held.pop((held_kind, value), (None, None))
+        else:
+            command = (None, None)
+        if held_kind is None and kind != "scroll":
+            self.held[(kind, value)] = command
+        getattr(self.backend, kind)(value)
+        self.commands.append(command)
+
+    def press(self, key, origin=None):
+        self.send("press", key, origin)
+
+    def release(self, key, origin=None):
+        self.send("release", key, origin, "press")
+
+    def mouse_press(self, button, origin=None):
+        self.send("mouse_press", button, origin)
+
+    def mouse_release(self, button, origin=None):
+        self.send("mouse_release", button, origin, "mouse_press")
+
+    def scroll(self, dy, origin=None):
+        self.send("scroll", dy, origin)
+
+    # the mouse mover only gets the direction, moves depend on its own timing
+    def set_direction(self, x, y, origin=None):
+        self.backend.record("mouse_direction", (x, y))
+        self.commands.append((None, None))
+
+    def stream(self):
+        return [
+            dict(
+                time=round(t * 1000, 1),
+                action=kind,
+                input=value if isinstance(value, (str, int, float)) else list(value),
+                name=name,
+                type=command_type,
+            )
+            for (t, kind, value), (name, command_type) in zip(self.backend.events, self.commands)
+        ]
+
+
+def load_session(session: str):
+    if session.startswith("synthetic:"):
+        return generate_sequence(SYNTHETIC_SESSIONS[session.split(":", 1)[1]])
+    with np.load(session) as data:
+        return {key: data[key] for key in data.files}
+
+
+def session_name(session: str):
+    if session.startswith("synthetic:"):
+        return "synthetic-" + session.split(":", 1)[1]
+    return os.path.splitext(os.path.basename(session))[0]
+
+
+def replay(session: str, movements_file=None):
+    """Command stream of a session, as a list of dicts sorted by time."""
+    data = load_session(session)
+    now = 0.0
+    clock = lambda: now
+    backend = RecordingBackend(clock)
+    recorder = CommandRecorder(backend)
+    scheduler = InputScheduler(clock)
+    body = BodyState(
+        dict(default_body_config, trajectory_templates_dir=None, classifier_model=None),
+        deepcopy(default_events_config),
+        recorder,
+        scheduler,
+        recorder,
+        LatencyTracker(),
+    )
+    if movements_file:
+        body.reload_movements(*load_movements_file(movements_file))
+
+    timestamps = data["timestamp"]
+    faces = data["face"].tolist()
+    for i in range(len(timestamps)):
+        timestamp = float(timestamps[i])
+        now = timestamp / 1000
+        scheduler.run_due(now)
+        body.calculate_arrays(data["pose"][i], data["world"][i], timestamp, faces[i])
+
+    if len(timestamps):
+        now = float(timestamps[-1]) / 1000 + FLUSH_SECONDS
+        scheduler.run_due(now)
+    body.events.reset()
+
+    # inputs of the same frame come out in set order, which changes between processes
+    return sorted(recorder.stream(), key=lambda e: (e["time"], e["action"], str(e["input"])))
+
+
+def event_key(event):
+    return (event["action"], str(event["input"]), event["name"], event["type"])
+
+
+def compare(expected: list, actual: list, tolerance_ms: float):
+    """
+    Differences between two command streams, as strings. Events are matched in order
+    per (action, input, name, type); matched events may be `tolerance_ms` apart.
+    """
+    expected_times = {}
+    for event in expected:
+        expected_times.setdefault(event_key(event), []).append(event["time"])
+    actual_times = {}
+    for event in actual:
+        actual_times.setdefault(event_key(event), []).append(event["time"])
+
+    differences = []
+    for key in sorted(expected_times.keys() | actual_times.keys(), key=str):
+        action, value, name, command_type = key
+        label = f"{action} {value} ({name}, {command_type})"
+        wanted = expected_times.get(key, [])
+        got = actual_times.get(key, [])
+        for a, b in zip(wanted, got):
+            if abs(a - b) > tolerance_ms:
+                differences.append(f"{label}: at {b} ms, expected {a} ms")
+                break
+        if len(wanted) != len(got):
+            differences.append(f"{label}: {len(got)} times, expected {len(wanted)}")
+    return differences
+
+
+def golden_path(golden_dir: str, session: str):
+    return os.path.join(golden_dir, session_name(session) + ".json")
+
+
+def run_session(job):
+    session, golden_dir, tolerance_ms, update, movements_file = job
+    start = time.perf_counter()
+    stream = replay(session, movements_file)
+    elapsed = time.perf_counter() - start
+    path = golden_path(golden_dir, session)
+
+    if update:
+        os.makedirs(golden_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(session=session_name(session), commands=stream), f, indent=1)
+        return session, elapsed, len(stream), None
+
+    if not os.path.exists(path):
+        return session, elapsed, len(stream), [f"no golden file {path}"]
+    with open(path, encoding="utf-8") as f:
+        expected = json.load(f)["commands"]
+    return session, elapsed, len(stream), compare(expected, stream, tolerance_ms)
+
+
+def expand_sessions(sessions: list):
+    expanded = []
+    for session in sessions:
+        if session == "synthetic:all":
+            expanded += [f"synthetic:{name}" for name in SYNTHETIC_SESSIONS]
+        else:
+            expanded.append(session)
+    return expanded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sessions", nargs="+", help=".npz files or synthetic:<name> / synthetic:all")
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR)
+    parser.add_argument("--update", action="store_true", help="write the golden files")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE_MS, help="ms")
+    parser.add_argument("--movements", help="movements file, defaults otherwise")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="processes")
+    args = parser.parse_args()
+
+    sessions = expand_sessions(args.sessions)
+    jobs = [(session, args.golden_dir, args.tolerance, args.update, args.movements) for session in sessions]
+    start = time.perf_counter()
+    with Pool(min(args.jobs, len(jobs))) as pool:
+        results = pool.map(run_session, jobs, chunksize=1)
+
+    failed = 0
+    for session, elapsed, count, differences in results:
+        status = "updated" if args.update else ("ok" if not differences else "FAILED")
+        print(f"{session}: {count} inputs, {elapsed:.2f} s, {status}")
+        for difference in differences or []:
+            print(f"    {difference}")
+        failed += bool(differences)
+    print(f"{len(results)} sessions in {time.perf_counter() - start:.2f} s, {failed} failed")
+
+    if failed:
+        sys.exit(1)
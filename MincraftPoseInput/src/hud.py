@@ -0,0 +1,90 @@
+import time
+import cv2
+
+HUD_FONT = cv2.FONT_HERSHEY_SIMPLEX
+HUD_FONT_SCALE = 0.45
+HUD_THICKNESS = 1
+HUD_COLOR = (255, 255, 255)
+HUD_BACKGROUND = (40, 40, 40)
+HUD_MARGIN = 6
+HUD_TEXT_INTERVAL = 0.25  # seconds between text updates, drawing reuses the cached lines
+
+# weight of the newest sample in the smoothed stage times
+STAGE_SMOOTHING = 0.1
+
+
+class PerfHud:
+    """Performance overlay drawn on the preview image."""
+
+    def __init__(self):
+        (_, text_height), baseline = cv2.getTextSize(
+            "Ag", HUD_FONT, HUD_FONT_SCALE, HUD_THICKNESS
+        )
+        self.line_height = text_height + baseline + 4
+        self.text_offset = text_height + 2
+
+        self.stage_ms = {}
+        self.frames = 0
+        self.fps_start = time.perf_counter()
+        self.inference_fps = 0.0
+
+        self.last_text_update = 0
+        self.lines = []
+        self.box_width = 0
+
+    # Smoothed duration of a pipeline stage
+    def observe_stage(self, name: str, ms: float):
+        previous = self.stage_ms.get(name)
+        self.stage_ms[name] = ms if previous is None else previous + (ms - previous) * STAGE_SMOOTHING
+
+    def frame_done(self):
+        self.frames += 1
+        now = time.perf_counter()
+        if now - self.fps_start >= 1:
+            self.inference_fps = self.frames / (now - self.fps_start)
+            self.frames = 0
+            self.fps_start = now
+
+    def update_text(self, capture_fps, dropped, empty, queue_depth, last_input):
+        now = time.perf_counter()
+        if now - self.last_text_update < HUD_TEXT_INTERVAL:
+            return
+        self.last_text_update = now
+
+        lines = [
+            f"capture {capture_fps:.1f} fps  inference {self.inference_fps:.1f} fps",
+            "  ".join(f"{name} {ms:.1f}" for name, ms in self.stage_ms.items()) + " ms",
+            f"dropped {dropped}  empty {empty}  input queue {queue_depth}",
+        ]
+        if last_input:
+            name, command_type, ms = last_input
+            lines.append(f"last {name} ({command_type}) {ms:.0f} ms")
+
+        if lines != self.lines:
+            self.lines = lines
+            self.box_width = max(
+                cv2.getTextSize(line, HUD_FONT, HUD_FONT_SCALE, HUD_THICKNESS)[0][0]
+                for line in lines
+            )
+
+    def draw(self, image):
+        if not self.lines:
+            return
+        cv2.rectangle(
+            image,
+            (0, 0),
+            (self.box_width + HUD_MARGIN * 2, self.line_height * len(self.lines) + HUD_MARGIN),
+            HUD_BACKGROUND,
+            cv2.FILLED,
+        )
+        for i, line in enumerate(self.lines):
+            cv2.putText(
+                image,
+                line,
+                (HUD_MARGIN, HUD_MARGIN + i * self.line_height + self.text_offset),
+                HUD_FONT,
+                HUD_FONT_SCALE,
+                HUD_COLOR,
+                HUD_THICKNESS,
+                cv2.LINE_AA,
+            )
@@ -0,0 +1,104 @@
+import threading
+import time
+
+# Keys and mouse buttons are passed as the names used in command_key_mappings
+# ("w", "space", "left", ...), each backend converts them to its own types.
+
+
+class InputBackend:
+    def press(self, key):
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+    def mouse_press(self, button):
+        raise NotImplementedError
+
+    def mouse_release(self, button):
+        raise NotImplementedError
+
+    def mouse_move(self, dx, dy):
+        raise NotImplementedError
+
+    def scroll(self, dy):
+        raise NotImplementedError
+
+
+class PynputBackend(InputBackend):
+    def __init__(self):
+        # imported here, pynput needs a display on Linux
+        from pynput.keyboard import Controller as KeyboardController
+        from pynput.mouse import Controller as MouseController
+        from .utils.keyboard import str_to_keyboard, str_to_mouse_button
+
+        self.keyboard = KeyboardController()
+        self.mouse = MouseController()
+        self.str_to_keyboard = str_to_keyboard
+        self.str_to_mouse_button = str_to_mouse_button
+
+    def press(self, key):
+        self.keyboard.press(self.str_to_keyboard(key))
+
+    def release(self, key):
+        self.keyboard.release(self.str_to_keyboard(key))
+
+    def mouse_press(self, button):
+        self.mouse.press(self.str_to_mouse_button(button))
+
+    def mouse_release(self, button):
+        self.mouse.release(self.str_to_mouse_button(button))
+
+    def mouse_move(self, dx, dy):
+        self.mouse.move(dx, dy)
+
+    def scroll(self, dy):
+        self.mouse.scroll(0, dy)
+
+
+class RecordingBackend(InputBackend):
+    """Keeps every input as (timestamp, kind, value) in memory, for headless runs and benchmarks."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.events = []
+
+    def record(self, kind, value):
+        with self.lock:
+            self.events.append((self.clock(), kind, value))
+
+    def press(self, key):
+        self.record("press", key)
+
+    def release(self, key):
+        self.record("release", key)
+
+    def mouse_press(self, button):
+        self.record("mouse_press", button)
+
+    def mouse_release(self, button):
+        self.record("mouse_release", button)
+
+    def mouse_move(self, dx, dy):
+        self.record("mouse_move", (dx, dy))
+
+    def scroll(self, dy):
+        self.record("scroll", dy)
+
+    def clear(self):
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+
+INPUT_BACKENDS = dict(
+    pynput=PynputBackend,
+    recording=RecordingBackend,
+)
+
+
+def create_input_backend(name: str):
+    if name not in INPUT_BACKENDS:
+        raise ValueError(f"unknown input backend {name}, one of {list(INPUT_BACKENDS)}")
+    return INPUT_BACKENDS[name]()
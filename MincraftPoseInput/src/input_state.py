@@ -0,0 +1,95 @@
+import threading
+from .tracing import TRACER
+
+KEY = "key"
+MOUSE_BUTTON = "mouse_button"
+
+
+class InputState:
+    """
+    Desired input state: every owner (a CommandProcessor, ...) declares the keys,
+    mouse buttons and mouse vector it wants active right now. apply() diffs the union
+    against what is actually pressed, so only the minimal press/release calls are sent
+    and a key wanted by several gestures is never released while one still holds it.
+    """
+
+    def __init__(self, output, mouse_thread):
+        self.output = output
+        self.mouse_thread = mouse_thread
+        self.lock = threading.Lock()
+
+        self.contributions = {}  # owner -> (inputs set, mouse vector, InputOrigin)
+        self.pressed = set()  # (KEY | MOUSE_BUTTON, value)
+        self.mouse_direction = (0, 0)
+        self.dirty = False
+
+    def set(self, owner, keys=(), mouse_buttons=(), mouse_move=None, origin=None):
+        inputs = {(KEY, key) for key in keys if key}
+        inputs |= {(MOUSE_BUTTON, button) for button in mouse_buttons if button}
+        with self.lock:
+            self.contributions[owner] = (inputs, mouse_move, origin)
+            self.dirty = True
+
+    def clear(self, owner):
+        with self.lock:
+            if self.contributions.pop(owner, None) is not None:
+                self.dirty = True
+
+    def desired(self):
+        inputs = set()
+        x, y = 0, 0
+        for owner_inputs, mouse_move, _ in self.contributions.values():
+            inputs |= owner_inputs
+            if mouse_move:
+                x += mouse_move[0]
+                y += mouse_move[1]
+        return inputs, (x, y)
+
+    # origin of the newest contribution wanting `wanted`, for latency tracing
+    def origin_of(self, wanted):
+        origin = None
+        for owner_inputs, mouse_move, owner_origin in self.contributions.values():
+            if owner_origin is None or not wanted(owner_inputs, mouse_move):
+                continue
+            if origin is None or owner_origin.event_time > origin.event_time:
+                origin = owner_origin
+        return origin
+
+    # Send the difference between the desired and the pressed inputs
+    def apply(self):
+        with TRACER.span("apply inputs", "input"), self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+
+            inputs, mouse_direction = self.desired()
+            for kind, value in self.pressed - inputs:
+                if kind == KEY:
+                    self.output.release(value)
+                else:
+                    self.output.mouse_release(value)
+            for kind, value in inputs - self.pressed:
+                origin = self.origin_of(lambda owner_inputs, _: (kind, value) in owner_inputs)
+                if kind == KEY:
+                    self.output.press(value, origin)
+                else:
+                    self.output.mouse_press(value, origin)
+            self.pressed = inputs
+
+            if mouse_direction != self.mouse_direction:
+                self.mouse_direction = mouse_direction
+                # the mouse thread records the latency when it actually moves
+                origin = self.origin_of(lambda _, mouse_move: mouse_move) if any(mouse_direction) else None
+                self.mouse_thread.set_direction(*mouse_direction, origin)
+
+    # Release everything, e.g. when the camera stops
+    def reset(self):
+        with self.lock:
+            self.contributions.clear()
+            self.dirty = True
+        self.apply()
+
+    def __str__(self):
+        with self.lock:
+            pressed = ", ".join(str(value) for _, value in self.pressed)
+        return f"pressed: {pressed or '-'} mouse: {self.mouse_direction}"
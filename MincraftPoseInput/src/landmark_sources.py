@@ -0,0 +1,302 @@
+"""
+Landmark sources: where BodyState gets pose / world landmarks from. Each source fills
+the caller's (33, 4) arrays in place, usually BodyState.pose_array / world_array, so
+landmarks from another process are copied once, straight into the state.
+
+    source.start()
+    frame = source.read(body.pose_array, body.world_array, timeout=1.0)
+    if frame and frame.detected:
+        body.calculate_arrays(body.pose_array, body.world_array, frame.timestamp, frame.face_direction)
+
+Sources:
+
+    MediaPipeSource     camera + mediapipe holistic in this process
+    SocketSource        src/remote.py frames over UDP/TCP (another machine or tracker)
+    SharedMemorySource  a shared memory block written by another tracker, layout below
+
+Shared memory layout, little endian, written with a sequence lock (see SharedMemoryWriter):
+
+    seq       uint32   odd while the writer is writing, +2 per frame
+    count     uint32   landmarks per array (N)
+    flags     uint32   1: pose detected
+    reserved  uint32
+    timestamp float64  ms, any monotonic clock
+    pose      N x 4 float32   x, y, z, visibility, normalized image coordinates
+    world     N x 4 float32   x, y, z (meters, hips center origin), visibility
+    face      2 float32       face direction x (pitch), y (yaw) degrees
+
+Sources not in the mediapipe landmark order set a mapping {name: source index} with the
+names of POSE_LANDMARK_NAMES; unmapped landmarks get NaN coordinates and visibility 0, so
+they are never visible and every comparison with them fails.
+"""
+import struct
+import time
+import numpy as np
+from .utils import POSE_LANDMARKS_COUNT, POSE_LANDMARK_NAMES
+
+SHM_HEADER = struct.Struct("<IIIId")
+SHM_POLL_INTERVAL = 0.001  # s
+FLAG_DETECTED = 1
+
+
+class SourceFrame:
+    __slots__ = ("timestamp", "detected", "face_direction", "captured", "restarted")
+
+    def __init__(self, timestamp, detected, face_direction=(0, 0), captured=None, restarted=False):
+        self.timestamp = timestamp  # ms
+        self.detected = detected  # the arrays hold a pose
+        self.face_direction = face_direction  # (x, y) degrees
+        self.captured = captured  # perf_counter of the camera frame, in-process sources only
+        self.restarted = restarted  # the source's clock restarted, older timestamps are meaningless
+
+
+class LandmarkMapping:
+    """Copies source landmarks into the mediapipe order, `mapping` is {name: source index}."""
+
+    def __init__(self, mapping: dict = None, source_count: int = POSE_LANDMARKS_COUNT):
+        self.source_count = source_count
+        if mapping is None:
+            if source_count != POSE_LANDMARKS_COUNT:
+                raise ValueError(f"{source_count} landmarks need a mapping to the {POSE_LANDMARKS_COUNT} pose landmarks")
+            self.identity = True
+            return
+
+        unknown = [name for name in mapping if name not in POSE_LANDMARK_NAMES]
+        if unknown:
+            raise ValueError(f"unknown landmarks in the mapping: {unknown}")
+        out_of_range = {name: i for name, i in mapping.items() if not 0 <= i < source_count}
+        if out_of_range:
+            raise ValueError(f"source indexes out of range (0..{source_count - 1}): {out_of_range}")
+
+        self.targets = np.array([POSE_LANDMARK_NAMES.index(name) for name in mapping], dtype=np.intp)
+        self.sources = np.array(list(mapping.values()), dtype=np.intp)
+        self.identity = (
+            source_count == POSE_LANDMARKS_COUNT
+            and len(self.targets) == POSE_LANDMARKS_COUNT
+            and (self.targets == self.sources).all()
+        )
+        self.unmapped = np.setdiff1d(np.arange(POSE_LANDMARKS_COUNT), self.targets)
+        # get_landmark_coordinates decides visibility from x, y, zeros would be in the image
+        self.unmapped_value = np.array((np.nan, np.nan, np.nan, 0), dtype=np.float32)
+
+    def apply(self, source, out):
+        if self.identity:
+            np.copyto(out, source, casting="unsafe")
+            return
+        out[self.targets] = source[self.sources]
+        out[self.unmapped] = self.unmapped_value
+
+
+class LandmarkSource:
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    # Fill pose_out / world_out with the next frame, None when nothing came in `timeout` s
+    def read(self, pose_out, world_out, timeout=1.0):
+        raise NotImplementedError
+
+    def get_log_rows(self):
+        return []
+
+
+class MediaPipeSource(LandmarkSource):
+    """Camera frames through mediapipe holistic, in this process."""
+
+    def __init__(self, mp_config: dict, camera="0"):
+        self.mp_config = mp_config
+        self.camera = str(camera)
+        self.cap = None
+        self.holistic = None
+        self.rgb_buffer = None
+
+    def start(self):
+        import cv2
+        from .capture_clock import CaptureClock
+        from .config import capture_clock_source
+        from .pipeline import create_holistic
+
+        self.video_file = not self.camera.isdigit()
+        self.cap = cv2.VideoCapture(self.camera if self.video_file else int(self.camera))
+        self.clock = CaptureClock(capture_clock_source)
+        self.holistic = create_holistic(self.mp_config)
+
+    def stop(self):
+        if self.holistic:
+            self.holistic.close()
+            self.holistic = None
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+    # Raises EOFError at the end of a video file
+    def read(self, pose_out, world_out, timeout=1.0):
+        import cv2
+        from .face_direction import caculate_face_direction
+
+        success, image, timestamp, captured = self.clock.read(self.cap)
+        if not success:
+            if self.video_file or not self.cap.isOpened():
+                raise EOFError(f"camera {self.camera} ended")
+            return None
+        if self.rgb_buffer is None or self.rgb_buffer.shape != image.shape:
+            self.rgb_buffer = np.empty_like(image)
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+        results = self.holistic.process(self.rgb_buffer)
+
+        if not results.pose_landmarks or not results.pose_world_landmarks:
+            return SourceFrame(timestamp, False, captured=captured)
+        for i, landmark in enumerate(results.pose_landmarks.landmark):
+            pose_out[i] = (landmark.x, landmark.y, landmark.z, landmark.visibility)
+        for i, landmark in enumerate(results.pose_world_landmarks.landmark):
+            world_out[i] = (landmark.x, landmark.y, landmark.z, landmark.visibility)
+        face_x, face_y, _ = caculate_face_direction(results, image, is_debugging=False)
+        return SourceFrame(timestamp, True, (face_x, face_y), captured)
+
+
+class SocketSource(LandmarkSource):
+    """Frames of the src/remote.py protocol, 33 landmark slots reordered by the mapping."""
+
+    def __init__(self, transport="udp", host="127.0.0.1", port=None, mapping=None):
+        from .remote import DEFAULT_PORT, LandmarkReceiver
+
+        self.receiver = LandmarkReceiver(transport, host, port or DEFAULT_PORT)
+        self.mapping = LandmarkMapping(mapping)
+
+    def start(self):
+        self.receiver.start()
+
+    def stop(self):
+        self.receiver.stop()
+
+    def read(self, pose_out, world_out, timeout=1.0):
+        frame = self.receiver.receive(timeout)
+        if frame is None:
+            return None
+        if frame.pose is None:
+            return SourceFrame(frame.timestamp, False, restarted=frame.restarted)
+        # float16 frames are converted by the copy
+        self.mapping.apply(frame.pose, pose_out)
+        self.mapping.apply(frame.world, world_out)
+        return SourceFrame(frame.timestamp, True, frame.face, restarted=frame.restarted)
+
+    def get_log_rows(self):
+        return self.receiver.get_log_rows()
+
+
+def shared_memory_size(count: int):
+    return SHM_HEADER.size + (2 * count * 4 + 2) * 4
+
+
+def shared_memory_views(buffer, count: int):
+    """(pose, world, face) float32 views of a shared memory block."""
+    offset = SHM_HEADER.size
+    pose = np.ndarray((count, 4), np.float32, buffer, offset)
+    offset += pose.nbytes
+    world = np.ndarray((count, 4), np.float32, buffer, offset)
+    offset += world.nbytes
+    face = np.ndarray((2,), np.float32, buffer, offset)
+    return pose, world, face
+
+
+class SharedMemorySource(LandmarkSource):
+    """Reads the newest frame of a shared memory block, see the layout above."""
+
+    def __init__(self, name="motionmap_landmarks", mapping=None):
+        self.name = name
+        self.mapping_config = mapping
+        self.shm = None
+        self.last_seq = None
+        self.frames = 0
+        self.torn = 0  # frames overwritten while copying, read again
+
+    def start(self):
+        from multiprocessing import shared_memory
+
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, track=False)
+        except TypeError:
+            # before Python 3.13 the resource tracker would unlink the writer's block on exit
+            from multiprocessing import resource_tracker
+
+            self.shm = shared_memory.SharedMemory(name=self.name)
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        _, self.count, _, _, _ = SHM_HEADER.unpack_from(self.shm.buf)
+        self.mapping = LandmarkMapping(self.mapping_config, self.count)
+        self.pose, self.world, self.face = shared_memory_views(self.shm.buf, self.count)
+        self.last_seq = None
+
+    def stop(self):
+        if self.shm:
+            # the views hold the buffer, release them before closing
+            self.pose = self.world = self.face = None
+            self.shm.close()
+            self.shm = None
+
+    def read(self, pose_out, world_out, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        buf = self.shm.buf
+        while True:
+            seq, _, flags, _, timestamp = SHM_HEADER.unpack_from(buf)
+            # 0: nothing written yet, odd: being written
+            if seq and seq != self.last_seq and not seq & 1:
+                if flags & FLAG_DETECTED:
+                    self.mapping.apply(self.pose, pose_out)
+                    self.mapping.apply(self.world, world_out)
+                face = (float(self.face[0]), float(self.face[1]))
+                # the writer did not touch the block while it was copied
+                if SHM_HEADER.unpack_from(buf)[0] == seq:
+                    self.last_seq = seq
+                    self.frames += 1
+                    return SourceFrame(timestamp, bool(flags & FLAG_DETECTED), face)
+                self.torn += 1
+                continue
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(SHM_POLL_INTERVAL)
+
+    def get_log_rows(self):
+        return [("Shared memory", f"{self.name}: {self.frames} frames, {self.torn} torn reads")]
+
+
+class SharedMemoryWriter:
+    """Producer side of SharedMemorySource, for trackers written in Python."""
+
+    def __init__(self, name="motionmap_landmarks", count=POSE_LANDMARKS_COUNT):
+        from multiprocessing import shared_memory
+
+        self.count = count
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=shared_memory_size(count))
+        self.seq = 0
+        SHM_HEADER.pack_into(self.shm.buf, 0, self.seq, count, 0, 0, 0.0)
+        self.pose, self.world, self.face = shared_memory_views(self.shm.buf, count)
+
+    def write(self, timestamp, pose=None, world=None, face=(0, 0)):
+        buf = self.shm.buf
+        flags = FLAG_DETECTED if pose is not None else 0
+        self.seq += 1
+        struct.pack_into("<I", buf, 0, self.seq)
+        if pose is not None:
+            self.pose[:] = pose
+            self.world[:] = world
+        self.face[:] = face
+        self.seq += 1
+        SHM_HEADER.pack_into(buf, 0, self.seq, self.count, flags, 0, timestamp)
+
+    def close(self):
+        self.pose = self.world = self.face = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def create_landmark_source(config: dict, mp_config: dict = None, camera="0"):
+    source_type = config["type"]
+    if source_type == "mediapipe":
+        return MediaPipeSource(mp_config, camera)
+    if source_type == "socket":
+        return SocketSource(config["transport"], config["host"], config["port"], config["mapping"])
+    if source_type == "shared_memory":
+        return SharedMemorySource(config["shared_memory_name"], config["mapping"])
+    raise ValueError(f"unknown landmark source {source_type}, one of mediapipe, socket, shared_memory")
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from .stats import Histogram
+
+# per command type hops, in ms
+HOPS = (
+    "inference",  # capture -> holistic.process done
+    "gestures",  # holistic.process done -> Events.add
+    "output",  # Events.add -> input call returned
+    "end_to_end",  # capture -> input call returned
+    "release_lateness",  # release deadline -> release timer ran
+)
+
+
+class FrameTrace:
+    """Monotonic (perf_counter) stamps of one frame along the pipeline."""
+
+    __slots__ = ("capture", "inference", "state")
+
+    def __init__(self, capture=None):
+        self.capture = time.perf_counter() if capture is None else capture
+        self.inference = None
+        self.state = None
+
+
+class InputOrigin:
+    """Which frame and command an input comes from, carried down to the input call."""
+
+    __slots__ = ("command_type", "trace", "event_time", "command_name")
+
+    def __init__(self, command_type, trace, event_time=None, command_name=None):
+        self.command_type = command_type
+        self.command_name = command_name
+        self.trace = trace
+        self.event_time = time.perf_counter() if event_time is None else event_time
+
+
+class LatencyTracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (command type, hop) -> Histogram
+        self.last_input = None  # (command name, command type, end to end ms)
+
+    def histogram(self, command_type, hop):
+        key = (command_type, hop)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, command_type, hop, ms):
+        self.histogram(command_type, hop).observe(ms)
+
+    # Called right after the input reached the backend (or the mouse thread)
+    def input_sent(self, origin: InputOrigin, now=None):
+        if origin is None:
+            return
+        if now is None:
+            now = time.perf_counter()
+        command_type = origin.command_type
+        self.observe(command_type, "output", (now - origin.event_time) * 1000)
+
+        trace = origin.trace
+        if trace is None:
+            return
+        end_to_end = (now - trace.capture) * 1000
+        self.observe(command_type, "end_to_end", end_to_end)
+        self.last_input = (origin.command_name or command_type, command_type, end_to_end)
+        if trace.inference is not None:
+            self.observe(command_type, "inference", (trace.inference - trace.capture) * 1000)
+            self.observe(
+                command_type, "gestures", (origin.event_time - trace.inference) * 1000
+            )
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def snapshot(self):
+        with self.lock:
+            items = sorted(self.histograms.items())
+        result = {}
+        for (command_type, hop), histogram in items:
+            result.setdefault(command_type, {})[hop] = histogram.snapshot()
+        return result
+
+    def export(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        print(f"saved latency to {path}")
+        return path
+
+    def get_log_rows(self):
+        with self.lock:
+            items = sorted(self.histograms.items())
+        return [
+            (f"{command_type} {hop}", str(histogram))
+            for (command_type, hop), histogram in items
+            if hop in ("end_to_end", "release_lateness")
+        ]
+
+    def __str__(self):
+        return "\n".join(f"{name}: {value}" for name, value in self.get_log_rows())
@@ -1,11 +1,59 @@
-from PySide6.QtCore import Qt
+from datetime import datetime
+from .tracing import TRACER
+from .event_stream import EVENT_STREAM
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
 from PySide6.QtWidgets import (
     QVBoxLayout,
-    QLabel,
     QWidget,
     QMainWindow,
+    QPushButton,
+    QTableView,
+    QHeaderView,
 )
 
+# Max refresh rate of the logs table
+LOGS_REFRESH_INTERVAL = 100  # ms
+
+
+class LogsTableModel(QAbstractTableModel):
+    """(name, value) rows, only changed cells are reported to the view."""
+
+    HEADERS = ("Name", "Value")
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def update_rows(self, rows: list):
+        names = [name for name, _ in rows]
+        if names != [name for name, _ in self.rows]:
+            self.beginResetModel()
+            self.rows = rows
+            self.endResetModel()
+            return
+
+        for i, (row, old_row) in enumerate(zip(rows, self.rows)):
+            if row[1] != old_row[1]:
+                self.rows[i] = row
+                value_index = self.index(i, 1)
+                self.dataChanged.emit(value_index, value_index, [Qt.DisplayRole])
+
 
 class LogsWindow(QWidget):
 
@@ -17,20 +65,81 @@ class LogsWindow(QWidget):
 
         self.parent_window = parent_window
 
+        # latest FrameResult from the camera thread, read by the refresh timer
+        self.frame = None
+
         self.setWindowTitle("Logs")
 
         log_layout = QVBoxLayout()
         log_layout.setAlignment(Qt.AlignTop)
 
-        self.state_label = QLabel(self)
-        self.state_label.setWordWrap(True)
+        self.model = LogsTableModel()
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
 
-        log_layout.addWidget(self.state_label)
+        log_layout.addWidget(self.table)
+
+        export_latency_button = QPushButton("Export latency")
+        export_latency_button.setToolTip("Save the latency histograms to a json file")
+        export_latency_button.clicked.connect(self.export_latency)
+        log_layout.addWidget(export_latency_button)
+
+        self.trace_button = QPushButton("Record trace")
+        self.trace_button.setToolTip(
+            "Record a timeline of all threads, saved as Chrome trace json when stopped "
+            "(open in chrome://tracing or ui.perfetto.dev)"
+        )
+        self.trace_button.clicked.connect(self.toggle_trace)
+        log_layout.addWidget(self.trace_button)
 
         main_layout = QVBoxLayout()
         main_layout.addLayout(log_layout)
         self.setLayout(main_layout)
 
+        # refresh only while visible
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(LOGS_REFRESH_INTERVAL)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def set_frame(self, frame):
+        self.frame = frame
+
+    def refresh(self):
+        if not self.frame:
+            return
+        rows = list(self.frame.log_rows)
+        rows += self.parent_window.cv2_thread.allocations.get_log_rows()
+        rows += EVENT_STREAM.get_log_rows()
+        self.model.update_rows(rows)
+
+    def showEvent(self, event):
+        self.parent_window.cv2_thread.log_rows_wanted = True
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.parent_window.cv2_thread.log_rows_wanted = False
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def export_latency(self):
+        self.parent_window.cv2_thread.latency.export(
+            f"latency-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+
+    def toggle_trace(self):
+        if TRACER.enabled:
+            TRACER.stop()
+            TRACER.dump(f"trace-{datetime.now():%Y%m%d-%H%M%S}.json")
+            self.trace_button.setText("Record trace")
+        else:
+            TRACER.start()
+            self.trace_button.setText("Stop and save trace")
+
     def toggle(self):
         if self.isVisible():
             self.hide()
@@ -1,5 +1,5 @@
-from PySide6.QtCore import Qt, Slot
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import Qt, Slot, QTimer
+from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
     QComboBox,
     QHBoxLayout,
@@ -12,9 +12,11 @@ from PySide6.QtWidgets import (
     QSlider,
     QPushButton,
     QBoxLayout,
+    QLineEdit,
 )
 from time import sleep
 from copy import deepcopy
+from datetime import datetime
 from .cv2_thread import Cv2Thread
 from .config import (
     window_title,
@@ -22,10 +24,14 @@ from .config import (
     IMAGE_WIDTH,
     IMAGE_HEIGHT,
     auto_start_camera,
+    profile_duration,
+    profile_interval,
     AppConfig,
 )
 from .utils import list_camera_ports
 from .logs import LogsWindow
+from .tracing import TRACER
+from .profiler import SamplingProfiler, mp_config_label
 
 
 class MainWindow(QMainWindow):
@@ -40,6 +46,8 @@ class MainWindow(QMainWindow):
         # Thread in charge of updating the image
         self.create_cv2_thread()
 
+        self.profiler = SamplingProfiler(profile_interval)
+
         # Create logs window
         self.logs_window = LogsWindow(
             parent_window=self,
@@ -64,6 +72,27 @@ class MainWindow(QMainWindow):
         logs_window_button.setFixedHeight(30)
         logs_window_button.clicked.connect(self.logs_window.toggle)
 
+        # Add record session button
+        self.record_btn = QPushButton("Record session")
+        self.record_btn.setFixedHeight(30)
+        self.record_btn.setToolTip("Record landmarks to the recordings folder")
+        self.record_btn.clicked.connect(self.record_btn_clicked)
+        self.record_label_input = QLineEdit()
+        self.record_label_input.setFixedHeight(30)
+        self.record_label_input.setPlaceholderText("Recording label")
+        self.record_label_input.setToolTip(
+            "Movement performed while recording, used to train the gesture classifier"
+        )
+
+        # Add capture profile button
+        self.profile_btn = QPushButton(f"Capture profile ({profile_duration} s)")
+        self.profile_btn.setFixedHeight(30)
+        self.profile_btn.setToolTip(
+            "Sample all threads for a few seconds while the lag happens, "
+            "saved as a speedscope file (open in speedscope.app)"
+        )
+        self.profile_btn.clicked.connect(self.profile_btn_clicked)
+
         config_layout = QVBoxLayout()
         # Add camera ports combobox
         self.add_controls_camera_ports(config_layout)
@@ -90,6 +119,9 @@ class MainWindow(QMainWindow):
         left_layout_buttons = QHBoxLayout()
         left_layout_buttons.addWidget(self.cv2_btn)
         left_layout_buttons.addWidget(logs_window_button)
+        left_layout_buttons.addWidget(self.record_label_input)
+        left_layout_buttons.addWidget(self.record_btn)
+        left_layout_buttons.addWidget(self.profile_btn)
         left_layout.addLayout(left_layout_buttons)
 
         # Main layout
@@ -123,19 +155,42 @@ class MainWindow(QMainWindow):
         )
         # self.cv2_thread.finished.connect(self.close)
         self.cv2_thread.update_status.connect(self.setCv2Status)
-        self.cv2_thread.update_frame.connect(self.setCv2Image)
-        self.cv2_thread.update_state.connect(self.setCv2State)
+        self.cv2_thread.frame_ready.connect(self.setCv2Frame)
 
     def cv2_btn_clicked(self):
         self.cv2_thread.toggle()
 
-    @Slot(QImage)
-    def setCv2Image(self, image):
-        self.camera_label.setPixmap(QPixmap.fromImage(image))
-
-    @Slot(dict)
-    def setCv2State(self, state: dict):
-        self.logs_window.state_label.setText(str(state["body"]))
+    def record_btn_clicked(self):
+        self.cv2_thread.recorder.toggle(self.record_label_input.text().strip())
+        if self.cv2_thread.recorder.recording:
+            self.record_btn.setText("Stop recording")
+        else:
+            self.record_btn.setText("Record session")
+
+    def profile_btn_clicked(self):
+        self.profiler.start()
+        self.profile_btn.setText("Profiling...")
+        self.profile_btn.setDisabled(True)
+        QTimer.singleShot(profile_duration * 1000, self.save_profile)
+
+    def save_profile(self):
+        self.profiler.stop()
+        label = mp_config_label(self.cv2_thread.mp_config)
+        self.profiler.save(
+            f"profile-{datetime.now():%Y%m%d-%H%M%S}-{label}.speedscope.json",
+            name=f"{window_title} {label}",
+        )
+        self.profile_btn.setText(f"Capture profile ({profile_duration} s)")
+        self.profile_btn.setDisabled(False)
+
+    @Slot()
+    def setCv2Frame(self):
+        frame = self.cv2_thread.take_frame()
+        if frame is None:
+            return
+        with TRACER.span("show frame", "gui"):
+            self.camera_label.setPixmap(QPixmap.fromImage(frame.image))
+        self.logs_window.set_frame(frame)
 
     @Slot(dict)
     def setCv2Status(self, status: dict):
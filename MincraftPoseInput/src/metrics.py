@@ -0,0 +1,265 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .stats import Histogram as StatsHistogram
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra="") -> str:
+    labels = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class CounterValue:
+    __slots__ = ("lock", "value")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Metric:
+    """
+    A metric family. labels(...) returns the child for one label set; keep it around
+    on hot paths so each update is a single locked add.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self.lock:
+                child = self.children.setdefault(values, self.new_child())
+        return child
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def new_child(self):
+        return CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        with self.lock:
+            items = list(self.children.items())
+        for values, child in items:
+            yield self.name, format_labels(self.labelnames, values), child.value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def new_child(self):
+        return GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def samples(self):
+        with self.lock:
+            items = list(self.children.items())
+        for values, child in items:
+            yield self.name, format_labels(self.labelnames, values), child.value
+
+
+class Histogram(Metric):
+    """Histogram of ms values, each child is a stats.Histogram."""
+
+    kind = "histogram"
+
+    def new_child(self):
+        return StatsHistogram()
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        with self.lock:
+            items = list(self.children.items())
+        for values, child in items:
+            with child.lock:
+                counts = list(child.counts)
+                count, total = child.count, child.sum
+            cumulative = 0
+            for bound, bucket_count in zip(child.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + format_value(bound) + '"'
+                yield (
+                    self.name + "_bucket",
+                    format_labels(self.labelnames, values, le),
+                    cumulative,
+                )
+            labels = format_labels(self.labelnames, values)
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def register(self, metric: Metric):
+        metric.name = self.prefix + metric.name
+        if metric.name in self.metrics:
+            raise ValueError(f"duplicate metric {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=()):
+        return self.register(Histogram(name, help, labelnames))
+
+    # Prometheus text exposition format
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry(prefix="motionmap_")
+
+# Cv2Thread
+FRAMES = REGISTRY.counter(
+    "frames_total",
+    "Camera frames by stage: captured, empty, processed, dropped (never shown)",
+    ("stage",),
+)
+INFERENCE_MS = REGISTRY.histogram("inference_ms", "holistic.process time per frame")
+FRAME_MS = REGISTRY.histogram("frame_ms", "Processing time per frame, capture to preview")
+CAPTURE_FPS = REGISTRY.gauge("capture_fps", "Mean camera frame rate")
+OUTPUT_QUEUE_DEPTH = REGISTRY.gauge("output_queue_depth", "Inputs waiting in the output dispatcher")
+
+# BodyState
+POSE_FRAMES = REGISTRY.counter(
+    "pose_frames_total", "Processed frames by whether a pose was detected", ("detected",)
+)
+GESTURES_DETECTED = REGISTRY.counter(
+    "gestures_detected_total", "Movements detected per movement name", ("movement",)
+)
+
+# Events
+GESTURES_FIRED = REGISTRY.counter(
+    "gestures_fired_total",
+    "Movements sent to a command processor, after the separated movements filter",
+    ("movement", "type"),
+)
+GESTURES_IGNORED = REGISTRY.counter(
+    "gestures_ignored_total",
+    "Movements ignored because a related movement fired recently",
+    ("movement",),
+)
+
+# CommandProcessor
+COMMAND_INPUTS = REGISTRY.counter(
+    "command_inputs_total", "Presses and releases per command type", ("type", "action")
+)
+RELEASE_LATENESS_MS = REGISTRY.histogram(
+    "release_lateness_ms", "Release timer lateness per command type", ("type",)
+)
+
+# MouseThread
+MOUSE_MOVES = REGISTRY.counter("mouse_moves_total", "Mouse move calls sent")
+MOUSE_PIXELS = REGISTRY.counter("mouse_pixels_total", "Mouse distance sent (|dx| + |dy|)")
+MOUSE_MOVING = REGISTRY.gauge("mouse_moving", "1 while the mouse thread is moving the mouse")
+
+
+class MetricsServer:
+    """Serves a registry on http://127.0.0.1:<port>/metrics from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, port=9464, host="127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        if self.server:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # no request logs in the console
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self.thread.start()
+        print(f"metrics on http://{self.host}:{self.server.server_port}/metrics")
+
+    def stop(self):
+        if not self.server:
+            return
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.server = None
+        self.thread = None
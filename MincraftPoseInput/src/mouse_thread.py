@@ -1,38 +1,126 @@
-from PySide6.QtCore import QThread, Signal, Slot
-from PySide6.QtWidgets import QApplication, QMainWindow
-from pynput.mouse import Controller
-import sys
+import threading
 import time
+from .input_backend import InputBackend
+from .metrics import MOUSE_MOVES, MOUSE_PIXELS, MOUSE_MOVING
+from .tracing import TRACER
 
-# 滑鼠控制器
-mouse = Controller()
 
-class MouseThread(QThread):
-    def __init__(self, speed=300):
-        super().__init__()
+class MouseThread:
+    """
+    Moves the mouse at `speed` px/s along the current direction. Sleeps on a condition
+    while the direction is (0, 0) and ticks at `rate` Hz otherwise. The velocity eases
+    toward a new direction over `smoothing` seconds, so directions updated once per
+    camera frame are interpolated at the mouse rate.
+    """
+
+    def __init__(self, backend: InputBackend, speed=300, rate=120, smoothing=0.0, latency=None):
+        # 滑鼠控制器
+        self.backend = backend
+        self.latency = latency
         self.speed = speed
+        self.rate = rate
+        self.smoothing = smoothing
         self.direction = {'x': 0, 'y': 0}
+        self.velocity_x = 0.0
+        self.velocity_y = 0.0
+        # origin of the latest direction change, its latency ends at the first move after it
+        self.pending_origin = None
+
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+        # 累積未滿 1 px 的移動量
+        self.remainder_x = 0.0
+        self.remainder_y = 0.0
+
+    def is_idle(self):
+        return self.direction['x'] == 0 and self.direction['y'] == 0
 
     def run(self):
-        last_time = time.time()  # 紀錄上次更新的時間
-        while not self.isInterruptionRequested():  # QThread 中止請求檢查
-            # 計算 deltaTime
-            current_time = time.time()
-            delta_time = current_time - last_time
-            last_time = current_time
+        period = 1 / self.rate
+        while True:
+            with self.condition:
+                while self.running and self.is_idle():
+                    MOUSE_MOVING.set(0)
+                    self.remainder_x = self.remainder_y = 0.0
+                    self.velocity_x = self.velocity_y = 0.0
+                    self.condition.wait()
+                if not self.running:
+                    MOUSE_MOVING.set(0)
+                    return
+                MOUSE_MOVING.set(1)
+                last_time = time.perf_counter()
+                next_tick = last_time + period
+            origin = None
+
+            while True:
+                # 等到下一次更新, 方向改變或停止時提早醒來
+                with self.condition:
+                    timeout = next_tick - time.perf_counter()
+                    if timeout > 0 and self.running:
+                        self.condition.wait(timeout)
+                    if not self.running or self.is_idle():
+                        break
+                    dx, dy = self.direction['x'], self.direction['y']
+                    if self.pending_origin is not None:
+                        origin, self.pending_origin = self.pending_origin, None
+
+                # 計算 deltaTime
+                current_time = time.perf_counter()
+                delta_time = current_time - last_time
+                last_time = current_time
+                if current_time >= next_tick:
+                    next_tick = max(next_tick + period, current_time)
+
+                # 速度平滑地接近目標方向
+                if self.smoothing > 0:
+                    blend = min(delta_time / self.smoothing, 1.0)
+                    self.velocity_x += (dx - self.velocity_x) * blend
+                    self.velocity_y += (dy - self.velocity_y) * blend
+                else:
+                    self.velocity_x, self.velocity_y = dx, dy
 
-            # 按照設定的方向和 deltaTime 調整滑鼠移動距離
-            move_x = self.direction['x'] * self.speed * delta_time
-            move_y = self.direction['y'] * self.speed * delta_time
+                # 按照設定的方向和 deltaTime 調整滑鼠移動距離, 保留小數部分
+                self.remainder_x += self.velocity_x * self.speed * delta_time
+                self.remainder_y += self.velocity_y * self.speed * delta_time
+                move_x = int(self.remainder_x)
+                move_y = int(self.remainder_y)
+                self.remainder_x -= move_x
+                self.remainder_y -= move_y
 
-            #print(self.direction['x'],self.direction['y'],move_x,move_y)
-            # 移動滑鼠
-            mouse.move(int(move_x), int(move_y))
-            time.sleep(0.01)  # 控制移動頻率
+                # 移動滑鼠
+                if move_x or move_y:
+                    move_start = time.perf_counter()
+                    self.backend.mouse_move(move_x, move_y)
+                    TRACER.add("mouse_move", "mouse", move_start, time.perf_counter())
+                    MOUSE_MOVES.inc()
+                    MOUSE_PIXELS.inc(abs(move_x) + abs(move_y))
+                    if origin is not None:
+                        if self.latency:
+                            self.latency.input_sent(origin)
+                        origin = None
 
-    @Slot(float, float)
-    def set_direction(self, x, y):
-        self.direction['x'] = x
-        self.direction['y'] = y
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, name="MouseThread", daemon=True)
+        self.thread.start()
 
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
 
+    # `origin` is the InputOrigin of a new non-zero direction, for the latency tracker
+    def set_direction(self, x, y, origin=None):
+        with self.condition:
+            self.direction['x'] = x
+            self.direction['y'] = y
+            self.pending_origin = origin
+            self.condition.notify()
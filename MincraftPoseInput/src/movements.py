@@ -88,12 +88,124 @@ def is_arm_up(state, side: Literal["left", "right"], up_shoulders_max_angle: int
 
 
 
+def resolve_operand(state, movements_config: dict, operand):
+    # numbers are used as is, "$NAME" reads a threshold, "LEFT_WRIST.pose.1" reads the state
+    if not isinstance(operand, str):
+        return operand
+    if operand.startswith("$"):
+        return movements_config[operand[1:]]
+
+    name, *path = operand.split(".")
+    value = state[name]
+    for part in path:
+        if value is None:
+            return None
+        value = value[int(part)] if part.isdigit() else value[part]
+    return value
+
+
+COMPARE_OPERATORS = ("eq", "ne", "gt", "lt", "gte", "lte")
+
+
+# Raises ValueError for unknown states, thresholds or operators in custom movements,
+# `state` has every state key (body.sample_state)
+def validate_custom_movements(movements_config: dict, custom_movements: list, state: dict):
+    def check_operand(where, operand):
+        if not isinstance(operand, str):
+            return
+        if operand.startswith("$"):
+            if operand[1:] not in movements_config:
+                raise ValueError(f"{where}: unknown threshold {operand}")
+            return
+        try:
+            resolve_operand(state, movements_config, operand)
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"{where}: unknown state {operand}") from None
+
+    for definition in custom_movements:
+        name = definition.get("name", "?")
+        for i, checkpoint in enumerate(definition["checkpoints"]):
+            where = f"movement {name}, checkpoint {i}"
+            active_duration = checkpoint.get("active_duration", None)
+            if isinstance(active_duration, str):
+                if not active_duration.startswith("$"):
+                    raise ValueError(f"{where}: active_duration must be a number or a $threshold")
+                check_operand(where, active_duration)
+            for comparison in checkpoint["all"]:
+                if not isinstance(comparison, list) or len(comparison) != 3:
+                    raise ValueError(f"{where}: comparison must be [a, operator, b], not {comparison}")
+                a, operator, b = comparison
+                if operator not in COMPARE_OPERATORS:
+                    raise ValueError(f"{where}: unknown operator {operator}, one of {', '.join(COMPARE_OPERATORS)}")
+                check_operand(where, a)
+                check_operand(where, b)
+
+
+def build_condition(movements_config: dict, comparisons: list):
+    # comparisons: [["LEFT_WRIST.pose.1", "gt", "LEFT_SHOULDER.pose.1"], ...], all must match
+    def condition(state):
+        for a, operator, b in comparisons:
+            if not compare_nums(
+                resolve_operand(state, movements_config, a),
+                resolve_operand(state, movements_config, b),
+                operator,
+            ):
+                return False
+        return True
+
+    return condition
+
+
+def build_custom_movement(movements_config: dict, definition: dict):
+    checkpoints = []
+    for checkpoint in definition["checkpoints"]:
+        active_duration = checkpoint.get("active_duration", None)
+        if isinstance(active_duration, str):
+            active_duration = resolve_operand({}, movements_config, active_duration)
+
+        checkpoints.append(
+            {
+                "condition": build_condition(movements_config, checkpoint["all"]),
+                **({"active_duration": active_duration} if active_duration else {}),
+            }
+        )
+
+    return {
+        "name": definition["name"],
+        "description": definition.get("description", ""),
+        "type": definition["type"],
+        "checkpoints": checkpoints,
+    }
+
+
 class Movements:
 
-    def __init__(self, movements_config: dict):
+    def __init__(self, movements_config: dict, custom_movements: list = None):
         self.movements_config = movements_config
+        self.custom_movements = custom_movements or []
         self.movements = []
 
+    # keep checkpoint states of movements that still have the same shape
+    def inherit_states(self, previous: "Movements"):
+        previous_by_name = {m["name"]: m for m in previous.get_current_list()}
+        for movement in self.get_current_list():
+            old = previous_by_name.get(movement["name"])
+            if not old or len(old["checkpoints"]) != len(movement["checkpoints"]):
+                continue
+            for checkpoint, old_checkpoint in zip(
+                movement["checkpoints"], old["checkpoints"]
+            ):
+                for key in ("state", "active_time"):
+                    if key in old_checkpoint:
+                        checkpoint[key] = old_checkpoint[key]
+
+    # forget checkpoint progress, e.g. when frame timestamps restart from 0
+    def reset_states(self):
+        for movement in self.movements:
+            for checkpoint in movement["checkpoints"]:
+                checkpoint.pop("state", None)
+                checkpoint.pop("active_time", None)
+
     def get_current_list(self):
         if not self.movements:
             self.movements = [
@@ -281,7 +393,7 @@ class Movements:
                         {
                             "condition": lambda state: compare_nums(
                                 state["FACE_DIRECTION_Y"],
-                                default_movements_config["FACE_LEFT_MIN"],
+                                self.movements_config["FACE_LEFT_MIN"],
                                 "gt",
                             ),
                         },
@@ -295,7 +407,7 @@ class Movements:
                         {
                             "condition": lambda state: compare_nums(
                                 state["FACE_DIRECTION_Y"],
-                                -default_movements_config["FACE_RIGHT_MIN"],
+                                -self.movements_config["FACE_RIGHT_MIN"],
                                 "lt",
                             ),
                         },
@@ -309,7 +421,7 @@ class Movements:
                         {
                             "condition": lambda state: compare_nums(
                                 state["FACE_DIRECTION_X"],
-                                default_movements_config["FACE_UP_MIN"],
+                                self.movements_config["FACE_UP_MIN"],
                                 "gt",
                             ),
                         },
@@ -323,7 +435,7 @@ class Movements:
                         {
                             "condition": lambda state: compare_nums(
                                 state["FACE_DIRECTION_X"],
-                                -default_movements_config["FACE_DOWN_MIN"],
+                                -self.movements_config["FACE_DOWN_MIN"],
                                 "lt",
                             ),
                         },
@@ -401,6 +513,16 @@ class Movements:
                 },
             ]
 
+            # custom movements replace built-in ones with the same name (keeping their order)
+            names = [m["name"] for m in self.movements]
+            for definition in self.custom_movements:
+                movement = build_custom_movement(self.movements_config, definition)
+                if movement["name"] in names:
+                    self.movements[names.index(movement["name"])] = movement
+                else:
+                    names.append(movement["name"])
+                    self.movements.append(movement)
+
         return self.movements
 
 
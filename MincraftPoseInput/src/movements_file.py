@@ -0,0 +1,77 @@
+import json
+import os
+import time
+import traceback
+from copy import deepcopy
+from .body import sample_state
+from .movements import Movements, default_movements_config, validate_custom_movements
+
+
+def load_movements_file(path: str):
+    """
+    Read a movements file and return (movements_config, custom_movements).
+    Thresholds missing from the file fall back to default_movements_config.
+
+    {
+        "thresholds": {"WALK_KNEE_MAX_ANGLE": 110, ...},
+        "movements": [
+            {
+                "name": "squat",
+                "type": "hold",
+                "checkpoints": [
+                    {"all": [["ANGLE_LEFT_KNEE", "lt", "$SQUAT_KNEE_MAX_ANGLE"]]}
+                ]
+            }
+        ]
+    }
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    movements_config = deepcopy(default_movements_config)
+    movements_config.update(data.get("thresholds", {}))
+    custom_movements = data.get("movements", [])
+
+    # reject a broken file before it reaches the running state, the conditions only fail
+    # once a frame is evaluated otherwise
+    validate_custom_movements(movements_config, custom_movements, sample_state())
+    Movements(movements_config, custom_movements).get_current_list()
+
+    return movements_config, custom_movements
+
+
+class MovementsFileWatcher:
+    def __init__(self, path: str, interval: float = 1.0):
+        self.path = path
+        self.interval = interval  # seconds between file checks
+        self.last_check = 0
+        self.last_mtime = None
+
+    # Returns (movements_config, custom_movements) when the file changed, otherwise None
+    def poll(self):
+        if not self.path:
+            return None
+
+        now = time.monotonic()
+        if now - self.last_check < self.interval:
+            return None
+        self.last_check = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+        if mtime == self.last_mtime:
+            return None
+        self.last_mtime = mtime
+
+        try:
+            result = load_movements_file(self.path)
+        except Exception:
+            print(f"failed to load movements file {self.path}")
+            print(traceback.format_exc())
+            return None
+
+        print(f"loaded movements file {self.path}")
+        return result
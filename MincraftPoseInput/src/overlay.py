@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+from .utils import POSE_LANDMARK_NAMES
+
+# same connections as mediapipe POSE_CONNECTIONS
+POSE_CONNECTIONS = np.array(
+    [
+        (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+        (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+        (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+        (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+        (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+    ],
+    dtype=np.intp,
+)
+
+# layer name -> BodyState flag, drawn in this order
+OVERLAY_LAYERS = dict(
+    connections="draw_connections",
+    landmarks="draw_landmarks",
+    angles="draw_angles",
+    face_direction="draw_face_direction",
+)
+
+# landmarks with lower visibility are not drawn, like mediapipe
+MIN_VISIBILITY = 0.5
+
+# colors are BGR, close to mediapipe's default pose style
+CONNECTION_COLOR = (224, 224, 224)
+CONNECTION_THICKNESS = 2
+LEFT_COLOR = (0, 138, 255)
+RIGHT_COLOR = (231, 217, 0)
+CENTER_COLOR = (224, 224, 224)
+LANDMARK_RADIUS = 3
+ANGLE_COLOR = (255, 255, 255)
+ANGLE_FONT_SCALE = 0.5
+FACE_DIRECTION_COLOR = (255, 0, 0)
+FACE_DIRECTION_LENGTH = 10  # pixels per degree
+
+
+class OverlayRenderer:
+    """
+    Draws the landmark overlay on the preview image. Styles are built once, pixel
+    coordinates come from BodyState.pose_array in one numpy operation per frame.
+    """
+
+    def __init__(self, angles: list):
+        self.landmark_colors = [
+            LEFT_COLOR if name.startswith("LEFT_")
+            else RIGHT_COLOR if name.startswith("RIGHT_")
+            else CENTER_COLOR
+            for name in POSE_LANDMARK_NAMES
+        ]
+        # (landmark index, angle state key) of the angles to label
+        self.angle_labels = [
+            (POSE_LANDMARK_NAMES.index(name), key) for name, key in angles
+        ]
+        self.size = None
+        self.scale = np.ones(2, dtype=np.float32)
+        self.points = np.zeros((len(POSE_LANDMARK_NAMES), 2), dtype=np.int32)
+
+    def layers(self, body):
+        return [layer for layer, flag in OVERLAY_LAYERS.items() if getattr(body, flag, False)]
+
+    def draw(self, image, body):
+        layers = self.layers(body)
+        if not layers:
+            return
+
+        h, w = image.shape[:2]
+        if self.size != (w, h):
+            self.size = (w, h)
+            self.scale[:] = (w, h)
+        # unmapped landmarks of external sources are NaN, not visible and not drawn
+        with np.errstate(invalid="ignore"):
+            np.multiply(body.pose_array[:, :2], self.scale, out=self.points, casting="unsafe")
+        visible = body.pose_array[:, 3] >= MIN_VISIBILITY
+
+        for layer in layers:
+            getattr(self, "draw_" + layer)(image, body, visible)
+
+    def draw_connections(self, image, body, visible):
+        pairs = POSE_CONNECTIONS[visible[POSE_CONNECTIONS].all(axis=1)]
+        if len(pairs):
+            cv2.polylines(
+                image,
+                list(self.points[pairs]),
+                False,
+                CONNECTION_COLOR,
+                CONNECTION_THICKNESS,
+                cv2.LINE_AA,
+            )
+
+    def draw_landmarks(self, image, body, visible):
+        for i in np.flatnonzero(visible):
+            cv2.circle(
+                image,
+                (int(self.points[i, 0]), int(self.points[i, 1])),
+                LANDMARK_RADIUS,
+                self.landmark_colors[i],
+                cv2.FILLED,
+                cv2.LINE_AA,
+            )
+
+    def draw_angles(self, image, body, visible):
+        for i, key in self.angle_labels:
+            angle_value = body.state.get(key)
+            if not angle_value or not visible[i]:
+                continue
+            cv2.putText(
+                image,
+                str(round(angle_value)),
+                (int(self.points[i, 0]), int(self.points[i, 1])),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                ANGLE_FONT_SCALE,
+                ANGLE_COLOR,
+                2,
+                cv2.LINE_AA,
+            )
+
+    def draw_face_direction(self, image, body, visible):
+        if body.face_nose is None:
+            return
+        w, h = self.size
+        x = body.state["FACE_DIRECTION_X"] or 0
+        y = body.state["FACE_DIRECTION_Y"] or 0
+        p1 = (int(body.face_nose[0] * w), int(body.face_nose[1] * h))
+        p2 = (int(p1[0] + y * FACE_DIRECTION_LENGTH), int(p1[1] - x * FACE_DIRECTION_LENGTH))
+        cv2.line(image, p1, p2, FACE_DIRECTION_COLOR, 3)
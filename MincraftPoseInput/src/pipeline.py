@@ -0,0 +1,235 @@
+import time
+import traceback
+import cv2
+import numpy as np
+from .body import BodyState
+from .config import AppConfig, capture_clock_source, track_allocations
+from .mouse_thread import MouseThread
+from .scheduler import InputScheduler
+from .dispatcher import OutputDispatcher
+from .input_backend import create_input_backend
+from .latency import FrameTrace, LatencyTracker
+from .capture_clock import CaptureClock
+from .movements_file import MovementsFileWatcher
+from .recorder import SessionRecorder
+from .stats import Histogram
+from . import metrics
+from .tracing import TRACER
+from .event_stream import EVENT_STREAM
+from .allocations import AllocationTracker
+
+BG_COLOR = (192, 192, 192)  # gray
+
+
+def create_holistic(mp_config: dict):
+    # imported here, replays and external landmarks run without mediapipe
+    import mediapipe as mp
+
+    return mp.solutions.holistic.Holistic(**mp_config)
+
+
+class PipelineFrame:
+    __slots__ = ("image", "timestamp", "captured", "detected")
+
+    def __init__(self, image, timestamp, captured, detected):
+        self.image = image  # BGR camera frame (segmented when enabled)
+        self.timestamp = timestamp  # capture clock ms
+        self.captured = captured  # perf_counter when the frame was grabbed
+        self.detected = detected
+
+
+class GesturePipeline:
+    """
+    Capture -> inference -> gestures -> inputs, without Qt. Cv2Thread adds the preview
+    on top of it, headless.py runs it alone.
+    """
+
+    def __init__(self, app_config: AppConfig, input_backend=None):
+        self.mp_config = app_config.mp_config
+        self.input_backend = input_backend or create_input_backend(app_config.input_backend)
+        self.latency = LatencyTracker()
+        self.mouse_thread = MouseThread(self.input_backend, **app_config.mouse_config, latency=self.latency)
+        self.input_scheduler = InputScheduler()
+        self.output = OutputDispatcher(self.input_backend, self.latency)
+        self.body = BodyState(
+            app_config.body_config,
+            app_config.events_config,
+            self.mouse_thread,
+            self.input_scheduler,
+            self.output,
+            self.latency,
+        )
+        self.movements_watcher = MovementsFileWatcher(
+            app_config.body_config["movements_file"]
+        )
+        self.recorder = SessionRecorder()
+        self.capture_clock = CaptureClock(capture_clock_source)
+        self.allocations = AllocationTracker(track_allocations)
+        # ms per stage, the GUI also gives them to its HUD
+        self.stages = {}
+        self.hud = None
+        self.frames = 0
+        self.empty_frames = 0
+        self.detected_frames = 0
+        # RGB copy of the camera frame for mediapipe, reused between frames
+        self.rgb_buffer = None
+
+    # Start sending inputs
+    def start(self):
+        self.mouse_thread.start()
+        self.output.start()
+        self.input_scheduler.start()
+
+    # Release everything and stop sending inputs
+    def stop(self):
+        self.input_scheduler.stop()
+        self.body.reset()
+        self.output.stop()
+        self.mouse_thread.stop()
+
+    def observe_stage(self, name: str, ms: float):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram()
+        histogram.observe(ms)
+        if self.hud:
+            self.hud.observe_stage(name, ms)
+
+    # One camera frame through inference and gestures, None when the camera gave nothing
+    def step(self, cap, holistic):
+        allocations = self.allocations
+        allocations.begin()
+        read_start = time.perf_counter()
+        success, image, timestamp, captured = self.capture_clock.read(cap)
+        read_end = time.perf_counter()
+        TRACER.add("capture", "cv2", read_start, read_end)
+        if not success:
+            self.empty_frames += 1
+            metrics.FRAMES.labels("empty").inc()
+            print("Ignoring empty camera frame.")
+            return None
+
+        trace = FrameTrace(captured)
+        metrics.FRAMES.labels("captured").inc()
+        self.observe_stage("capture", (read_end - captured) * 1000)
+        allocations.mark("capture")
+
+        # Recolor image to RGB, the BGR frame is kept for drawing
+        if self.rgb_buffer is None or self.rgb_buffer.shape != image.shape:
+            self.rgb_buffer = np.empty_like(image)
+        rgb = self.rgb_buffer
+        rgb.flags.writeable = True
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb)
+        # To improve performance, mark the image as not writeable to
+        # pass by reference.
+        rgb.flags.writeable = False
+
+        # Make detection
+        results = holistic.process(rgb)
+        trace.inference = time.perf_counter()
+        TRACER.add("inference", "cv2", read_end, trace.inference)
+        inference_ms = (trace.inference - captured) * 1000
+        self.observe_stage("inference", inference_ms)
+        metrics.INFERENCE_MS.observe(inference_ms)
+        allocations.mark("inference")
+
+        if (
+            self.mp_config["enable_segmentation"]
+            and results.segmentation_mask is not None
+        ):
+            try:
+                # Draw selfie segmentation on the background image.
+                # To improve segmentation around boundaries, consider applying a joint
+                # bilateral filter to "results.segmentation_mask" with "image".
+                condition = (
+                    np.stack((results.segmentation_mask,) * 3, axis=-1) > 0.1
+                )
+                # The background can be customized.
+                #   a) Load an image (with the same width and height of the input image) to
+                #      be the background, e.g., bg_image = cv2.imread('/path/to/image/file')
+                #   b) Blur the input image by applying image filtering, e.g.,
+                #      bg_image = cv2.GaussianBlur(image,(55,55),0)
+                bg_image = cv2.GaussianBlur(image, (55, 55), 0)
+                if bg_image is None:
+                    bg_image = np.zeros(image.shape, dtype=np.uint8)
+                    bg_image[:] = BG_COLOR
+                image = np.where(condition, image, bg_image)
+            except Exception:
+                print(traceback.format_exc())
+
+        stage_start = time.perf_counter()
+        TRACER.add("segmentation", "cv2", trace.inference, stage_start)
+        allocations.mark("segmentation")
+
+        detected = self.process(image, results, timestamp, trace)
+        now = time.perf_counter()
+        self.observe_stage("gestures", (now - stage_start) * 1000)
+        TRACER.add("gestures", "cv2", stage_start, now, dict(detected=detected))
+        allocations.mark("gestures")
+        return PipelineFrame(image, timestamp, captured, detected)
+
+    # Gestures and inputs of one inference result
+    def process(self, image, results, timestamp, trace=None):
+        self.apply_movements_update()
+        detected = self.body.calculate(image, results, timestamp, trace)
+        self.frame_done(detected, timestamp)
+        return detected
+
+    # Same, from landmark arrays (replays, landmarks computed elsewhere)
+    def process_arrays(self, pose, world, timestamp, face_direction=(0, 0)):
+        self.apply_movements_update()
+        start = time.perf_counter()
+        detected = self.body.calculate_arrays(pose, world, timestamp, face_direction)
+        self.observe_stage("gestures", (time.perf_counter() - start) * 1000)
+        self.frame_done(detected, timestamp)
+        return detected
+
+    # One frame of a landmark source, written straight into the body arrays.
+    # None when the source gave nothing within `timeout` s
+    def step_source(self, source, timeout=1.0):
+        body = self.body
+        frame = source.read(body.pose_array, body.world_array, timeout)
+        if frame is None:
+            return None
+        if frame.restarted:
+            body.reset()
+        if frame.detected:
+            self.process_arrays(body.pose_array, body.world_array, frame.timestamp, frame.face_direction)
+        else:
+            metrics.POSE_FRAMES.labels("false").inc()
+            body.pose_lost()
+            self.frame_done(False, frame.timestamp)
+        return frame
+
+    # Apply edited movements file between frames
+    def apply_movements_update(self):
+        movements_update = self.movements_watcher.poll()
+        if movements_update:
+            self.body.reload_movements(*movements_update)
+
+    def frame_done(self, detected, timestamp):
+        self.frames += 1
+        if detected:
+            self.detected_frames += 1
+            self.recorder.add(timestamp, self.body)
+
+    def get_log_rows(self):
+        rows = [
+            ("Frames", f"{self.frames}, detected {self.detected_frames}, empty {self.empty_frames}"),
+        ]
+        rows += [(f"Stage {name}", str(histogram)) for name, histogram in self.stages.items()]
+        return rows
+
+    # Stats of a run without the GUI, `rows` are added before the inputs
+    def print_stats(self, elapsed: float, rows=()):
+        print(f"--- {elapsed:.0f} s, {self.frames / elapsed if elapsed else 0:.1f} frames/s")
+        rows = self.capture_clock.get_log_rows()[:1] + list(rows) + self.get_log_rows()
+        rows += [
+            (f"{name} ({command.commands_count})", str(command).replace("\n", " / "))
+            for name, command in self.body.events.commands_map.items()
+        ]
+        rows.append(("Output", self.output.get_log_value()))
+        rows += self.latency.get_log_rows()
+        rows += EVENT_STREAM.get_log_rows()
+        for name, value in rows:
+            print(f"{name}: {value}")
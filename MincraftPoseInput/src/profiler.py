@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# max stack depth kept per sample
+MAX_STACK_DEPTH = 128
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every thread every `interval` seconds from a
+    background thread (sys._current_frames), so the profiled code runs unmodified.
+    Samples are counted per (thread, stack) and saved as a speedscope file with
+    one profile per thread, or as collapsed stacks ("a;b;c count").
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.thread = None
+        self.running = False
+        self.stop_event = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.frames = []  # speedscope frames: dict(name, file, line)
+        self.frame_index = {}  # (name, file, line) -> index in frames
+        self.samples = {}  # thread name -> {stack tuple of frame indexes: count}
+        self.sample_count = 0
+        self.start_time = None
+        self.duration = 0.0
+
+    def frame_id(self, code, line):
+        key = (code.co_name, code.co_filename, line)
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append(dict(name=key[0], file=key[1], line=key[2]))
+        return index
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self.frame_id(frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()  # root first
+            thread_samples = self.samples.setdefault(names.get(tid, str(tid)), {})
+            stack = tuple(stack)
+            thread_samples[stack] = thread_samples.get(stack, 0) + 1
+        self.sample_count += 1
+
+    def run(self):
+        next_sample = time.perf_counter()
+        while not self.stop_event.is_set():
+            self.sample()
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay < 0:
+                # 取樣太慢, 跳過錯過的時間點
+                next_sample = time.perf_counter()
+                delay = 0
+            self.stop_event.wait(delay)
+
+    def start(self):
+        if self.running:
+            return
+        self.reset()
+        self.running = True
+        self.stop_event.clear()
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name="SamplingProfiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.running = False
+        self.duration = time.perf_counter() - self.start_time
+
+    def to_speedscope(self, name: str):
+        profiles = []
+        for thread_name, stacks in sorted(self.samples.items()):
+            samples = list(stacks.keys())
+            weights = [count * self.interval for count in stacks.values()]
+            profiles.append(
+                dict(
+                    type="sampled",
+                    name=thread_name,
+                    unit="seconds",
+                    startValue=0,
+                    endValue=sum(weights),
+                    samples=[list(stack) for stack in samples],
+                    weights=weights,
+                )
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "MotionMap sampling profiler",
+            "shared": dict(frames=self.frames),
+            "profiles": profiles,
+        }
+
+    def to_collapsed(self):
+        lines = []
+        for thread_name, stacks in sorted(self.samples.items()):
+            for stack, count in stacks.items():
+                names = [thread_name] + [
+                    f"{self.frames[i]['name']} ({os.path.basename(self.frames[i]['file'])}:{self.frames[i]['line']})"
+                    for i in stack
+                ]
+                lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    # .txt writes collapsed stacks, anything else a speedscope json
+    def save(self, path: str, name: str = "profile"):
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".txt"):
+                f.write(self.to_collapsed())
+            else:
+                json.dump(self.to_speedscope(name), f)
+        print(f"saved profile to {path} ({self.sample_count} samples, {self.duration:.1f} s)")
+        return path
+
+
+# Short label of the mediapipe config for profile names, e.g. "complexity2-seg0-det0.5-track0.5"
+def mp_config_label(mp_config: dict):
+    return (
+        f"complexity{mp_config.get('model_complexity')}"
+        f"-seg{int(bool(mp_config.get('enable_segmentation')))}"
+        f"-det{mp_config.get('min_detection_confidence')}"
+        f"-track{mp_config.get('min_tracking_confidence')}"
+    )
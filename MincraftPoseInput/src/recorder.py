@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+import numpy as np
+
+
+class SessionRecorder:
+    """
+    Records the landmarks of every processed frame and saves them as a .npz file:
+    timestamp (N,) ms, pose (N, 33, 4), world (N, 33, 4), face (N, 2) face direction x/y,
+    label (N,) the movement being performed ("" when none), used to train the classifier
+    """
+
+    def __init__(self, directory: str = "recordings"):
+        self.directory = directory
+        self.recording = False
+        self.label = ""
+        self.clear()
+
+    def clear(self):
+        self.timestamps = []
+        self.poses = []
+        self.worlds = []
+        self.faces = []
+        self.labels = []
+
+    def start(self, label: str = ""):
+        self.clear()
+        self.label = label
+        self.recording = True
+
+    def add(self, timestamp, body):
+        if not self.recording:
+            return
+        self.timestamps.append(timestamp)
+        self.poses.append(body.pose_array.copy())
+        self.worlds.append(body.world_array.copy())
+        self.faces.append(
+            (body.state["FACE_DIRECTION_X"] or 0, body.state["FACE_DIRECTION_Y"] or 0)
+        )
+        self.labels.append(self.label)
+
+    # Returns the saved file path, or None when nothing was recorded
+    def stop(self):
+        self.recording = False
+        if not self.timestamps:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory, f"session-{datetime.now():%Y%m%d-%H%M%S}.npz"
+        )
+        np.savez_compressed(
+            path,
+            timestamp=np.array(self.timestamps, dtype=np.float64),
+            pose=np.array(self.poses, dtype=np.float32),
+            world=np.array(self.worlds, dtype=np.float32),
+            face=np.array(self.faces, dtype=np.float32),
+            label=np.array(self.labels, dtype=str),
+        )
+        self.clear()
+        print(f"saved session to {path}")
+        return path
+
+    def toggle(self, label: str = ""):
+        if self.recording:
+            return self.stop()
+        self.start(label)
+        return None
@@ -0,0 +1,501 @@
+"""
+Split mode: a server runs capture + mediapipe and streams landmark frames, a client
+runs gestures and inputs on the gaming PC.
+
+    python -m src.remote serve --camera 0 --model-complexity 1
+    python -m src.remote client --host 192.168.1.20
+
+    # localhost test without a camera or mediapipe
+    python -m src.remote serve --replay recordings/session-x.npz
+    python -m src.remote client --backend recording
+
+Frame, little endian, one UDP datagram or one length-prefixed (uint16) TCP message:
+
+    magic     4s       b"MMLF"
+    version   uint8    2
+    flags     uint8    1: float16 landmarks, 2: pose detected
+    session   uint32   random per server start, its timestamps and seq restart
+    seq       uint32   frame number, +1 per frame
+    timestamp float64  capture time, ms on the server capture clock
+    server_ms float32  capture -> sent on the server (ms)
+    sent      float64  wall clock when sent (ms since epoch)
+    # only when pose detected
+    pose      33x4     x, y, z, visibility, float16 or float32
+    world     33x4     same
+    face      2x float32  face direction x, y (degrees)
+
+UDP clients subscribe by sending HELLO every HELLO_INTERVAL, the server forgets them
+after SUBSCRIBER_TIMEOUT. Frames older than the newest received one are dropped, seq
+gaps are counted as lost, a new session resets both and the client's gesture history.
+Network latency uses the wall clocks of both machines, it is only exact on the same
+host or with synchronized clocks.
+"""
+import argparse
+import random
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from .stats import Histogram
+from .utils import POSE_LANDMARKS_COUNT
+
+DEFAULT_PORT = 5005
+MAGIC = b"MMLF"
+VERSION = 2
+HELLO = b"MMLH"
+HELLO_INTERVAL = 1.0  # s
+SUBSCRIBER_TIMEOUT = 5.0  # s
+TCP_SEND_TIMEOUT = 0.05  # s, a client slower than this is disconnected
+RECONNECT_INTERVAL = 1.0  # s
+
+FLAG_FLOAT16 = 1
+FLAG_POSE = 2
+
+HEADER = struct.Struct("<4sBBIIdfd")
+LENGTH = struct.Struct("<H")
+FACE_DTYPE = np.dtype("<f4")
+
+
+def landmarks_dtype(flags):
+    return np.dtype("<f2") if flags & FLAG_FLOAT16 else np.dtype("<f4")
+
+
+def frame_size(flags):
+    if not flags & FLAG_POSE:
+        return HEADER.size
+    landmarks = POSE_LANDMARKS_COUNT * 4 * landmarks_dtype(flags).itemsize
+    return HEADER.size + 2 * landmarks + 2 * FACE_DTYPE.itemsize
+
+
+def encode_frame(session, seq, timestamp, pose=None, world=None, face=(0, 0), server_ms=0.0, float16=False):
+    flags = FLAG_FLOAT16 if float16 else 0
+    if pose is not None:
+        flags |= FLAG_POSE
+    header = HEADER.pack(
+        MAGIC, VERSION, flags, session, seq & 0xFFFFFFFF, timestamp, server_ms, time.time() * 1000
+    )
+    if pose is None:
+        return header
+    dtype = landmarks_dtype(flags)
+    return b"".join(
+        (
+            header,
+            np.asarray(pose, dtype=dtype).tobytes(),
+            np.asarray(world, dtype=dtype).tobytes(),
+            np.asarray(face, dtype=FACE_DTYPE).tobytes(),
+        )
+    )
+
+
+class RemoteFrame:
+    __slots__ = ("session", "seq", "timestamp", "server_ms", "sent", "pose", "world", "face", "restarted")
+
+    def __init__(self, session, seq, timestamp, server_ms, sent, pose, world, face):
+        self.session = session
+        self.seq = seq
+        self.timestamp = timestamp
+        self.server_ms = server_ms
+        self.sent = sent
+        self.pose = pose  # (33, 4) view of the message, None when no pose was detected
+        self.world = world
+        self.face = face  # (x, y)
+        self.restarted = False  # first frame of a new server session, set by LandmarkReceiver
+
+
+def decode_frame(data):
+    """RemoteFrame from one message, pose and world are read-only views of `data`."""
+    if len(data) < HEADER.size:
+        raise ValueError(f"frame too short: {len(data)} bytes")
+    magic, version, flags, session, seq, timestamp, server_ms, sent = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a landmark frame: {magic!r} v{version}")
+    if len(data) != frame_size(flags):
+        raise ValueError(f"frame size {len(data)}, expected {frame_size(flags)}")
+    if not flags & FLAG_POSE:
+        return RemoteFrame(session, seq, timestamp, server_ms, sent, None, None, (0, 0))
+
+    dtype = landmarks_dtype(flags)
+    count = POSE_LANDMARKS_COUNT * 4
+    offset = HEADER.size
+    pose = np.frombuffer(data, dtype, count, offset).reshape(POSE_LANDMARKS_COUNT, 4)
+    offset += count * dtype.itemsize
+    world = np.frombuffer(data, dtype, count, offset).reshape(POSE_LANDMARKS_COUNT, 4)
+    offset += count * dtype.itemsize
+    face = tuple(np.frombuffer(data, FACE_DTYPE, 2, offset).tolist())
+    return RemoteFrame(session, seq, timestamp, server_ms, sent, pose, world, face)
+
+
+class LandmarkSender:
+    """Server side, sends every frame to the subscribed UDP clients or connected TCP clients."""
+
+    def __init__(self, transport="udp", host="0.0.0.0", port=DEFAULT_PORT, float16=False):
+        self.transport = transport
+        self.host = host
+        self.port = port
+        self.float16 = float16
+        self.sock = None
+        self.session = random.getrandbits(32)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.subscribers = {}  # udp: address -> last hello time
+        self.clients = []  # tcp sockets
+        self.sent = 0
+        self.disconnected = 0
+        self.accept_thread = None
+
+    def start(self):
+        if self.sock:
+            return
+        if self.transport == "udp":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+            self.sock.setblocking(False)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind((self.host, self.port))
+            self.sock.listen()
+            self.accept_thread = threading.Thread(
+                target=self.accept, name="LandmarkSender", daemon=True
+            )
+            self.accept_thread.start()
+        self.port = self.sock.getsockname()[1]
+        print(f"streaming landmarks on {self.transport}://{self.host}:{self.port}")
+
+    def stop(self):
+        sock, self.sock = self.sock, None
+        if sock:
+            sock.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+            self.subscribers = {}
+
+    def accept(self):
+        while self.sock:
+            try:
+                client, address = self.sock.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.settimeout(TCP_SEND_TIMEOUT)
+            print(f"landmark client {address[0]}:{address[1]} connected")
+            with self.lock:
+                self.clients.append(client)
+
+    # Read pending hellos, drop silent subscribers
+    def poll_subscribers(self):
+        now = time.monotonic()
+        while True:
+            try:
+                data, address = self.sock.recvfrom(64)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            if data == HELLO:
+                if address not in self.subscribers:
+                    print(f"landmark client {address[0]}:{address[1]} subscribed")
+                self.subscribers[address] = now
+        for address, last_seen in list(self.subscribers.items()):
+            if now - last_seen > SUBSCRIBER_TIMEOUT:
+                del self.subscribers[address]
+
+    def send(self, timestamp, pose=None, world=None, face=(0, 0), server_ms=0.0):
+        if not self.sock:
+            return
+        data = encode_frame(self.session, self.seq, timestamp, pose, world, face, server_ms, self.float16)
+        self.seq += 1
+
+        if self.transport == "udp":
+            self.poll_subscribers()
+            for address in self.subscribers:
+                try:
+                    self.sock.sendto(data, address)
+                    self.sent += 1
+                except OSError:
+                    pass
+            return
+
+        message = LENGTH.pack(len(data)) + data
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.sendall(message)
+                self.sent += 1
+            except OSError:
+                # a partial send breaks the framing, the client reconnects
+                client.close()
+                self.disconnected += 1
+                with self.lock:
+                    self.clients.remove(client)
+
+    def get_log_rows(self):
+        clients = len(self.subscribers) if self.transport == "udp" else len(self.clients)
+        return [
+            ("Remote", f"seq {self.seq}, clients {clients}, sent {self.sent}, disconnected {self.disconnected}"),
+        ]
+
+
+class LandmarkReceiver:
+    """Client side, receive() returns the next newer frame or None on timeout."""
+
+    def __init__(self, transport="udp", host="127.0.0.1", port=DEFAULT_PORT):
+        self.transport = transport
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.buffer = bytearray()
+        self.last_hello = 0.0
+        self.last_connect = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.session = None
+        self.last_seq = None
+        self.received = 0
+        self.lost = 0
+        self.stale = 0  # reordered or duplicated, dropped
+        self.invalid = 0
+        self.restarts = 0
+        self.network_latency = Histogram()  # sent -> received
+        self.server_latency = Histogram()  # capture -> sent on the server
+
+    def start(self):
+        if self.transport == "udp" and not self.sock:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind(("0.0.0.0", 0))
+
+    def stop(self):
+        sock, self.sock = self.sock, None
+        if sock:
+            sock.close()
+        self.buffer.clear()
+
+    def receive(self, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            data = self.read_message(remaining)
+            if data is None:
+                continue
+            try:
+                frame = decode_frame(data)
+            except ValueError as error:
+                self.invalid += 1
+                print(error)
+                continue
+            if self.accept_frame(frame):
+                return frame
+
+    def read_message(self, timeout):
+        if self.transport == "udp":
+            now = time.monotonic()
+            if now - self.last_hello >= HELLO_INTERVAL:
+                self.last_hello = now
+                self.sock.sendto(HELLO, (self.host, self.port))
+            self.sock.settimeout(min(timeout, HELLO_INTERVAL))
+            try:
+                data, _ = self.sock.recvfrom(4096)
+                return data
+            except socket.timeout:
+                return None
+            except ConnectionResetError:
+                # windows reports the server port being closed
+                time.sleep(min(timeout, HELLO_INTERVAL))
+                return None
+
+        if not self.sock and not self.connect():
+            time.sleep(min(timeout, RECONNECT_INTERVAL))
+            return None
+        try:
+            while True:
+                if len(self.buffer) >= LENGTH.size:
+                    (size,) = LENGTH.unpack_from(self.buffer)
+                    if len(self.buffer) >= LENGTH.size + size:
+                        data = bytes(self.buffer[LENGTH.size : LENGTH.size + size])
+                        del self.buffer[: LENGTH.size + size]
+                        return data
+                self.sock.settimeout(timeout)
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    raise ConnectionError("server closed the connection")
+                self.buffer += chunk
+        except socket.timeout:
+            return None
+        except OSError as error:
+            print(f"landmark server: {error}")
+            self.stop()
+            return None
+
+    def connect(self):
+        now = time.monotonic()
+        if now - self.last_connect < RECONNECT_INTERVAL:
+            return False
+        self.last_connect = now
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=RECONNECT_INTERVAL)
+        except OSError:
+            return False
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return True
+
+    # Sequence checks and stats, False when the frame is dropped
+    def accept_frame(self, frame: RemoteFrame):
+        if frame.session != self.session:
+            # the (re)started server counts seq and timestamps from 0 again
+            if self.session is not None:
+                self.restarts += 1
+                frame.restarted = True
+            self.session = frame.session
+        elif frame.seq <= self.last_seq:
+            self.stale += 1
+            return False
+        else:
+            self.lost += frame.seq - self.last_seq - 1
+        self.last_seq = frame.seq
+        self.received += 1
+        self.network_latency.observe(max(time.time() * 1000 - frame.sent, 0.0))
+        self.server_latency.observe(frame.server_ms)
+        return True
+
+    @property
+    def loss(self):
+        total = self.received + self.lost
+        return self.lost / total if total else 0.0
+
+    def get_log_rows(self):
+        return [
+            (
+                "Remote",
+                f"received {self.received}, lost {self.lost} ({self.loss:.1%}), stale {self.stale}, "
+                f"invalid {self.invalid}, restarts {self.restarts}",
+            ),
+            ("Remote network", str(self.network_latency)),
+            ("Remote server", str(self.server_latency)),
+        ]
+
+
+def serve_replay(sender: LandmarkSender, path: str, loop: bool):
+    with np.load(path) as data:
+        session = {key: data[key] for key in data.files}
+    timestamps = session["timestamp"]
+    duration = timestamps[-1] - timestamps[0] + 1000 / 30
+    start = time.perf_counter()
+    loops = 0
+    while True:
+        for i in range(len(timestamps)):
+            offset = loops * duration + timestamps[i] - timestamps[0]
+            delay = start + offset / 1000 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sender.send(offset, session["pose"][i], session["world"][i], session["face"][i])
+        if not loop:
+            return
+        loops += 1
+
+
+def serve_camera(sender: LandmarkSender, camera: str, mp_config: dict):
+    from .landmark_sources import MediaPipeSource
+
+    source = MediaPipeSource(mp_config, camera)
+    pose = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+    world = np.zeros((POSE_LANDMARKS_COUNT, 4), dtype=np.float32)
+    source.start()
+    try:
+        while True:
+            try:
+                frame = source.read(pose, world)
+            except EOFError:
+                break
+            if frame is None:
+                continue
+            server_ms = (time.perf_counter() - frame.captured) * 1000
+            if frame.detected:
+                sender.send(frame.timestamp, pose, world, frame.face_direction, server_ms)
+            else:
+                sender.send(frame.timestamp, server_ms=server_ms)
+    finally:
+        source.stop()
+
+
+def run_client(args):
+    from copy import deepcopy
+    from .config import AppConfig, default_body_config
+    from .landmark_sources import SocketSource
+    from .pipeline import GesturePipeline
+
+    app_config = AppConfig()
+    app_config.body_config = dict(default_body_config, draw_angles=False)
+    app_config.events_config = deepcopy(app_config.events_config)
+    if args.movements:
+        app_config.body_config["movements_file"] = args.movements
+    if args.backend:
+        app_config.input_backend = args.backend
+
+    source = SocketSource(args.transport, args.host, args.port)
+    receiver = source.receiver
+    pipeline = GesturePipeline(app_config)
+    source.start()
+    pipeline.start()
+    start = last_stats = time.perf_counter()
+    try:
+        while not args.duration or time.perf_counter() - start < args.duration:
+            # landmarks are copied from the message straight into the body arrays
+            pipeline.step_source(source, timeout=0.5)
+            now = time.perf_counter()
+            if now - last_stats >= args.stats_interval:
+                last_stats = now
+                pipeline.print_stats(now - start, receiver.get_log_rows())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        source.stop()
+    pipeline.print_stats(time.perf_counter() - start, receiver.get_log_rows())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("serve", "client"))
+    parser.add_argument("--transport", choices=("udp", "tcp"), default="udp")
+    parser.add_argument("--host", help="serve: bind address (0.0.0.0), client: server (127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    # serve
+    parser.add_argument("--camera", default="0", help="camera port or video file")
+    parser.add_argument("--replay", help="stream a recorded session .npz instead of the camera")
+    parser.add_argument("--loop", action="store_true", help="replay forever")
+    parser.add_argument("--float16", action="store_true", help="half size frames")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2))
+    # client
+    parser.add_argument("--backend", help="input backend, pynput or recording")
+    parser.add_argument("--movements", help="movements file (default from the config)")
+    parser.add_argument("--duration", type=float, help="seconds, until Ctrl+C otherwise")
+    parser.add_argument("--stats-interval", type=float, default=5, help="seconds between stats")
+    args = parser.parse_args()
+
+    if args.mode == "client":
+        args.host = args.host or "127.0.0.1"
+        run_client(args)
+    else:
+        sender = LandmarkSender(args.transport, args.host or "0.0.0.0", args.port, args.float16)
+        sender.start()
+        try:
+            if args.replay:
+                serve_replay(sender, args.replay, args.loop)
+            else:
+                from .config import default_mp_config
+
+                mp_config = dict(default_mp_config)
+                if args.model_complexity is not None:
+                    mp_config["model_complexity"] = args.model_complexity
+                serve_camera(sender, args.camera, mp_config)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for name, value in sender.get_log_rows():
+                print(f"{name}: {value}")
+            sender.stop()
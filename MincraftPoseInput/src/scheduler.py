@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from .stats import Histogram
+from .tracing import TRACER
+
+
+class ScheduledAction:
+    __slots__ = ("deadline", "seq", "callback", "cancelled")
+
+    def __init__(self, deadline, seq, callback):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.cancelled = False
+
+    # cancelled actions stay in the heap and are skipped when popped
+    def cancel(self):
+        self.cancelled = True
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class InputScheduler:
+    """
+    One thread running press/release actions at their deadline, replacing a
+    threading.Timer (and an OS thread) per command.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.heap = []
+        self.seq = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+        # how late actions run compared to their deadline (ms)
+        self.lateness = Histogram()
+
+    # Run `callback(handle)` in `delay` seconds, returns the handle, which can be cancelled
+    def schedule(self, delay: float, callback):
+        with self.condition:
+            action = ScheduledAction(self.clock() + delay, next(self.seq), callback)
+            heapq.heappush(self.heap, action)
+            # wake the thread only when the earliest deadline changed
+            if self.heap[0] is action:
+                self.condition.notify()
+        return action
+
+    # Push back the deadline of a pending action, returns the new handle
+    def extend(self, action: ScheduledAction, delay: float):
+        action.cancel()
+        return self.schedule(delay, action.callback)
+
+    def pop_due(self, now):
+        due = []
+        with self.condition:
+            while self.heap and (self.heap[0].cancelled or self.heap[0].deadline <= now):
+                action = heapq.heappop(self.heap)
+                if not action.cancelled:
+                    due.append(action)
+        return due
+
+    # Run the actions due at `now`, also used to drive the scheduler with a fake clock
+    def run_due(self, now=None):
+        if now is None:
+            now = self.clock()
+        for action in self.pop_due(now):
+            self.lateness.observe(max(0.0, (self.clock() - action.deadline) * 1000))
+            try:
+                with TRACER.span("timer", "scheduler", dict(callback=getattr(action.callback, "__qualname__", "?"))):
+                    action.callback(action)
+            except Exception:
+                print(traceback.format_exc())
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    while self.heap and self.heap[0].cancelled:
+                        heapq.heappop(self.heap)
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    timeout = self.heap[0].deadline - self.clock()
+                    if timeout <= 0:
+                        break
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+            self.run_due()
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, name="InputScheduler", daemon=True)
+        self.thread.start()
+
+    # Stop the thread, pending actions run right away so no key stays pressed
+    def stop(self, run_pending: bool = True):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+            pending = [a for a in self.heap if not a.cancelled] if run_pending else []
+            self.heap = []
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+        for action in sorted(pending):
+            try:
+                action.callback(action)
+            except Exception:
+                print(traceback.format_exc())
+
+    def __len__(self):
+        return len(self.heap)
@@ -0,0 +1,69 @@
+import bisect
+import threading
+
+# bucket upper bounds in ms, finer around the few ms that matter for input timing
+DEFAULT_BUCKETS = (
+    0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 33, 50, 100, 200, 500, 1000, 5000,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram of ms values, cheap enough to observe on every frame."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # one extra bucket for values above the last bound
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+            self.last = 0.0
+
+    def observe(self, value: float):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.last = value
+            if value > self.max:
+                self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    # Upper bound of the bucket holding the q-th quantile (0..1)
+    def percentile(self, q: float):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return dict(
+            count=self.count,
+            mean=self.mean,
+            p50=self.percentile(0.5),
+            p99=self.percentile(0.99),
+            max=self.max,
+            buckets=list(self.buckets),
+            counts=list(self.counts),
+        )
+
+    def __str__(self):
+        if not self.count:
+            return "-"
+        return (
+            f"n={self.count} mean={self.mean:.2f} p50<={self.percentile(0.5)} "
+            f"p99<={self.percentile(0.99)} max={self.max:.2f} ms"
+        )
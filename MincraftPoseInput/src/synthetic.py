@@ -0,0 +1,242 @@
+"""
+Synthetic landmarks for benchmarks and replays without a camera: a parametric body
+(arm raise and elbow bend, knee lift, body bounce, head yaw/pitch) animated into
+gesture sequences. Arrays use the session recording layout (see src/recorder.py),
+LandmarkResults wraps them as mediapipe-like results.
+
+World coordinates are meters around the hips center, x to the image right (the
+person's left side, facing the camera), y down and z toward the camera negative.
+"""
+from types import SimpleNamespace
+import numpy as np
+from .utils import POSE_LANDMARKS_COUNT, POSE_LANDMARK_NAMES
+
+FPS = 30
+
+UPPER_ARM = 0.27
+FOREARM = 0.25
+THIGH = 0.42
+SHIN = 0.40
+
+# image position of the hips center and meters -> image units
+IMAGE_CENTER = (0.5, 0.5)
+IMAGE_SCALE = 0.5
+
+# head landmarks relative to the neck (meters), the person's left side is +x
+HEAD = dict(
+    NOSE=(0.0, -0.15, -0.10),
+    LEFT_EYE_INNER=(0.015, -0.185, -0.09),
+    LEFT_EYE=(0.03, -0.187, -0.09),
+    LEFT_EYE_OUTER=(0.045, -0.187, -0.085),
+    RIGHT_EYE_INNER=(-0.015, -0.185, -0.09),
+    RIGHT_EYE=(-0.03, -0.187, -0.09),
+    RIGHT_EYE_OUTER=(-0.045, -0.187, -0.085),
+    LEFT_EAR=(0.075, -0.17, 0.0),
+    RIGHT_EAR=(-0.075, -0.17, 0.0),
+    MOUTH_LEFT=(0.025, -0.115, -0.09),
+    MOUTH_RIGHT=(-0.025, -0.115, -0.09),
+)
+NECK = (0.0, -0.45, 0.0)
+SHOULDER_X = 0.18
+HIP_X = 0.10
+
+INDEX = {name: i for i, name in enumerate(POSE_LANDMARK_NAMES)}
+
+# animated parameters, all angles in degrees
+PARAMS = (
+    "left_arm",  # arm raise from hanging down, outward in the image plane
+    "right_arm",
+    "left_elbow",  # extra bend of the forearm, same direction
+    "right_elbow",
+    "left_knee",  # thigh lift toward the camera
+    "right_knee",
+    "bounce",  # whole body up (meters)
+    "yaw",  # head turn, positive to the person's left (FACE_DIRECTION_Y)
+    "pitch",  # head up (FACE_DIRECTION_X)
+)
+
+
+def bump(phase):
+    """0 -> 1 -> 0 over each cycle of `phase` (0..1), smooth at both ends."""
+    return np.sin(np.pi * (phase % 1.0)) ** 2
+
+
+def idle(t):
+    return dict(left_arm=5 + 2 * np.sin(t), right_arm=5 + 2 * np.sin(t))
+
+
+def walk(t, period=1.0):
+    step = np.sin(2 * np.pi * t / period)
+    return dict(
+        left_knee=85 * np.clip(step, 0, None),
+        right_knee=85 * np.clip(-step, 0, None),
+        left_arm=10 - 10 * step,
+        right_arm=10 + 10 * step,
+        bounce=0.02 * np.abs(step),
+    )
+
+
+def swing(side, t, period=1.2):
+    raised = bump(t / period)
+    return {
+        f"{side}_arm": 5 + 150 * raised,
+        f"{side}_elbow": 20 * raised,
+        f"{'right' if side == 'left' else 'left'}_arm": np.full_like(t, 5.0),
+    }
+
+
+def jump(t, period=1.5):
+    raised = bump(t / period)
+    return dict(
+        left_arm=5 + 170 * raised,
+        right_arm=5 + 170 * raised,
+        bounce=0.1 * bump(2 * t / period) * raised,
+    )
+
+
+def head_turn(t, period=2.0):
+    return dict(
+        yaw=20 * np.sin(2 * np.pi * t / period),
+        pitch=8 * np.sin(4 * np.pi * t / period),
+        left_arm=np.full_like(t, 5.0),
+        right_arm=np.full_like(t, 5.0),
+    )
+
+
+GESTURES = dict(
+    idle=idle,
+    walk=walk,
+    left_swing=lambda t: swing("left", t),
+    right_swing=lambda t: swing("right", t),
+    jump=jump,
+    head_turn=head_turn,
+)
+
+
+def set_points(world, name, points):
+    world[:, INDEX[name], :3] = points
+
+
+def build_world(params: dict, frames: int):
+    """World landmarks (frames, 33, 4) from parameter arrays (missing ones are 0)."""
+    p = {name: np.broadcast_to(np.asarray(params.get(name, 0.0), dtype=np.float64), (frames,)) for name in PARAMS}
+    world = np.zeros((frames, POSE_LANDMARKS_COUNT, 4))
+    world[:, :, 3] = 0.99
+    up = np.zeros((frames, 3))
+    up[:, 1] = -p["bounce"]
+
+    # head, turned around the neck
+    yaw = np.radians(p["yaw"])[:, None]
+    pitch = np.radians(p["pitch"])[:, None]
+    neck = np.array(NECK) + up
+    for name, (x, y, z) in HEAD.items():
+        turned_x = x * np.cos(yaw) - z * np.sin(yaw)
+        turned_z = x * np.sin(yaw) + z * np.cos(yaw)
+        raised_y = y * np.cos(pitch) + turned_z * np.sin(pitch)
+        raised_z = -y * np.sin(pitch) + turned_z * np.cos(pitch)
+        set_points(world, name, neck + np.concatenate([turned_x, raised_y, raised_z], axis=1))
+
+    for side, sign in (("LEFT", 1.0), ("RIGHT", -1.0)):
+        lower = side.lower()
+
+        # arm in the image plane
+        shoulder = np.array((sign * SHOULDER_X, NECK[1], 0.0)) + up
+        arm = np.radians(p[f"{lower}_arm"])[:, None]
+        forearm = arm + np.radians(p[f"{lower}_elbow"])[:, None]
+        upper_dir = np.concatenate([sign * np.sin(arm), np.cos(arm), np.zeros_like(arm)], axis=1)
+        forearm_dir = np.concatenate([sign * np.sin(forearm), np.cos(forearm), np.zeros_like(arm)], axis=1)
+        elbow = shoulder + UPPER_ARM * upper_dir
+        wrist = elbow + FOREARM * forearm_dir
+        outward = np.array((sign * 0.02, 0.0, 0.0))
+        set_points(world, f"{side}_SHOULDER", shoulder)
+        set_points(world, f"{side}_ELBOW", elbow)
+        set_points(world, f"{side}_WRIST", wrist)
+        set_points(world, f"{side}_PINKY", wrist + 0.08 * forearm_dir + outward)
+        set_points(world, f"{side}_INDEX", wrist + 0.09 * forearm_dir)
+        set_points(world, f"{side}_THUMB", wrist + 0.05 * forearm_dir - outward + (0, 0, -0.02))
+
+        # leg, the thigh lifts toward the camera and the shin stays vertical
+        hip = np.array((sign * HIP_X, 0.0, 0.0)) + up
+        knee_lift = np.radians(p[f"{lower}_knee"])[:, None]
+        thigh_dir = np.concatenate([np.zeros_like(knee_lift), np.cos(knee_lift), -np.sin(knee_lift)], axis=1)
+        knee = hip + THIGH * thigh_dir
+        ankle = knee + (0.0, SHIN, 0.0)
+        set_points(world, f"{side}_HIP", hip)
+        set_points(world, f"{side}_KNEE", knee)
+        set_points(world, f"{side}_ANKLE", ankle)
+        set_points(world, f"{side}_HEEL", ankle + (0.0, 0.04, 0.05))
+        set_points(world, f"{side}_FOOT_INDEX", ankle + (sign * 0.03, 0.06, -0.12))
+
+    return world
+
+
+def world_to_pose(world, center=IMAGE_CENTER, scale=IMAGE_SCALE):
+    """Normalized image landmarks of a person facing the camera."""
+    pose = world.copy()
+    pose[..., 0] = center[0] + world[..., 0] * scale
+    pose[..., 1] = center[1] + world[..., 1] * scale
+    pose[..., 2] = world[..., 2] * scale
+    return pose
+
+
+def generate(gesture: str, seconds: float, fps=FPS, seed=0, noise=0.003, start=0.0):
+    """
+    One gesture for `seconds`, as a dict with the session recording keys:
+    timestamp (N,) ms, pose (N, 33, 4), world (N, 33, 4), face (N, 2), label (N,)
+    """
+    frames = int(round(seconds * fps))
+    t = np.arange(frames) / fps
+    params = GESTURES[gesture](t)
+    world = build_world(params, frames)
+    pose = world_to_pose(world)
+
+    if noise:
+        rng = np.random.default_rng(seed)
+        pose[..., :3] += rng.normal(0, noise, pose[..., :3].shape)
+        world[..., :3] += rng.normal(0, noise, world[..., :3].shape)
+
+    face = np.zeros((frames, 2))
+    face[:, 0] = np.broadcast_to(params.get("pitch", 0.0), (frames,))
+    face[:, 1] = np.broadcast_to(params.get("yaw", 0.0), (frames,))
+
+    return dict(
+        timestamp=(start + t) * 1000,
+        pose=pose.astype(np.float32),
+        world=world.astype(np.float32),
+        face=face.astype(np.float32),
+        label=np.full(frames, gesture),
+    )
+
+
+def generate_sequence(parts: list, fps=FPS, seed=0, noise=0.003):
+    """Gestures one after another, `parts` is [(gesture, seconds), ...]."""
+    sequences = []
+    start = 0.0
+    for i, (gesture, seconds) in enumerate(parts):
+        sequences.append(generate(gesture, seconds, fps, seed + i, noise, start))
+        start += seconds
+    return {key: np.concatenate([s[key] for s in sequences]) for key in sequences[0]}
+
+
+class LandmarkResults:
+    """Mediapipe-like holistic results from arrays, updated in place by set()."""
+
+    def __init__(self):
+        self.pose_landmarks = SimpleNamespace(landmark=self.new_landmarks())
+        self.pose_world_landmarks = SimpleNamespace(landmark=self.new_landmarks())
+        # face landmarks are not generated, face direction is only in the arrays
+        self.face_landmarks = None
+        self.segmentation_mask = None
+
+    @staticmethod
+    def new_landmarks():
+        return [SimpleNamespace(x=0.0, y=0.0, z=0.0, visibility=0.0) for _ in range(POSE_LANDMARKS_COUNT)]
+
+    def set(self, pose, world):
+        for landmarks, values in (
+            (self.pose_landmarks.landmark, pose.tolist()),
+            (self.pose_world_landmarks.landmark, world.tolist()),
+        ):
+            for landmark, (x, y, z, visibility) in zip(landmarks, values):
+                landmark.x, landmark.y, landmark.z, landmark.visibility = x, y, z, visibility
+        return self
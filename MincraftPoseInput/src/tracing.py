@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+
+# events kept in memory, older ones are overwritten
+TRACE_CAPACITY = 65536
+
+
+class Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """
+    Opt-in timeline of pipeline spans from every thread, in a fixed-size ring buffer.
+    Times are perf_counter seconds; dump() writes Chrome trace-event JSON that
+    chrome://tracing and ui.perfetto.dev can open.
+    """
+
+    def __init__(self, capacity: int = TRACE_CAPACITY):
+        self.capacity = capacity
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.events = [None] * self.capacity
+            self.index = 0
+            self.thread_names = {}
+            self.origin = time.perf_counter()
+
+    def start(self):
+        self.clear()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    # Record a finished span, for code that already has perf_counter stamps
+    def add(self, name, category, start, end, args=None):
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        with self.lock:
+            self.events[self.index % self.capacity] = (name, category, start, end, tid, args)
+            self.index += 1
+
+    def instant(self, name, category, args=None):
+        now = time.perf_counter()
+        self.add(name, category, now, None, args)
+
+    # with tracer.span("name", "category"): ...
+    def span(self, name, category, args=None):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def snapshot(self):
+        with self.lock:
+            if self.index <= self.capacity:
+                events = self.events[: self.index]
+            else:
+                start = self.index % self.capacity
+                events = self.events[start:] + self.events[:start]
+            return events, dict(self.thread_names), self.index - len(events)
+
+    def to_chrome(self):
+        events, thread_names, overwritten = self.snapshot()
+        pid = os.getpid()
+        trace_events = [
+            dict(name="thread_name", ph="M", pid=pid, tid=tid, args=dict(name=name))
+            for tid, name in thread_names.items()
+        ]
+        for name, category, start, end, tid, args in events:
+            event = dict(
+                name=name,
+                cat=category,
+                pid=pid,
+                tid=tid,
+                ts=(start - self.origin) * 1e6,
+            )
+            if end is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=(end - start) * 1e6)
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return dict(
+            traceEvents=trace_events,
+            displayTimeUnit="ms",
+            otherData=dict(overwritten=overwritten),
+        )
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f)
+        print(f"saved trace to {path}")
+        return path
+
+
+TRACER = Tracer()
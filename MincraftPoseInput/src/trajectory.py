@@ -0,0 +1,193 @@
+import argparse
+import glob
+import os
+import numpy as np
+from .utils import POSE_LANDMARK_NAMES, normalize_landmarks
+
+# Each template costs O(template length) per frame, keep the total bounded
+MAX_TRAJECTORY_TEMPLATES = 8
+
+DEFAULT_TEMPLATE_LANDMARKS = ("LEFT_ELBOW", "RIGHT_ELBOW", "LEFT_WRIST", "RIGHT_WRIST")
+DEFAULT_TEMPLATE_THRESHOLD = 0.35  # mean distance per template frame, in shoulder widths
+
+
+class TrajectoryTemplate:
+    def __init__(
+        self,
+        name: str,
+        movement_type: str,
+        landmarks: tuple,
+        poses: np.ndarray,
+        threshold: float = DEFAULT_TEMPLATE_THRESHOLD,
+    ):
+        self.name = name
+        self.type = movement_type
+        self.landmarks = tuple(landmarks)
+        self.indices = [POSE_LANDMARK_NAMES.index(name) for name in self.landmarks]
+        self.threshold = threshold
+
+        # (frames, 33, 4) raw poses -> (frames, features) normalised trajectory
+        self.frames = np.stack(
+            [normalize_landmarks(pose, self.indices).ravel() for pose in poses]
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        data = np.load(path)
+        return cls(
+            name=str(data["name"]),
+            movement_type=str(data["type"]),
+            landmarks=tuple(str(n) for n in data["landmarks"]),
+            poses=data["pose"],
+            threshold=float(data["threshold"]),
+        )
+
+    @staticmethod
+    def save(
+        path: str,
+        name: str,
+        movement_type: str,
+        poses: np.ndarray,
+        landmarks: tuple = DEFAULT_TEMPLATE_LANDMARKS,
+        threshold: float = DEFAULT_TEMPLATE_THRESHOLD,
+    ):
+        np.savez_compressed(
+            path,
+            name=name,
+            type=movement_type,
+            landmarks=np.array(landmarks),
+            pose=np.asarray(poses, dtype=np.float32),
+            threshold=threshold,
+        )
+
+
+class StreamingDTW:
+    """
+    Subsequence DTW updated one frame at a time.
+    cost[j] is the cheapest alignment of the recent frames that ends at template frame j,
+    steps come from (j) (user slower), (j - 1) and (j - 2) (user faster, the skipped
+    template frame is still paid) of the previous frame, so the whole column is updated
+    with numpy without a per-element loop.
+    """
+
+    def __init__(self, frames: np.ndarray):
+        self.frames = frames
+        length, features = frames.shape
+
+        # two leading inf cells so the j - 1 / j - 2 steps are plain slices
+        self.cost = np.full(length + 2, np.inf)
+        self.diff = np.empty((length, features))
+        self.distance = np.empty(length)
+        self.best = np.empty(length)
+        self.skip = np.full(length, np.inf)
+
+    def reset(self):
+        self.cost[2:] = np.inf
+
+    # Returns the mean cost per template frame of the best match ending now
+    def update(self, features: np.ndarray):
+        np.subtract(self.frames, features, out=self.diff)
+        np.square(self.diff, out=self.diff)
+        np.sum(self.diff, axis=1, out=self.distance)
+        np.sqrt(self.distance, out=self.distance)
+
+        cost = self.cost
+        np.add(cost[1:-2], self.distance[:-1], out=self.skip[1:])
+        np.minimum(cost[2:], cost[1:-1], out=self.best)
+        np.minimum(self.best, self.skip, out=self.best)
+        # a match can start at any frame
+        self.best[0] = 0
+
+        np.add(self.distance, self.best, out=cost[2:])
+
+        return cost[-1] / len(self.distance)
+
+
+class TrajectoryMatcher:
+    def __init__(self, templates: list = None):
+        self.templates = []
+        self.matchers = []
+        self.scores = {}
+
+        for template in templates or []:
+            self.add_template(template)
+
+    @classmethod
+    def from_directory(cls, directory: str):
+        # no directory configured, or not created yet: no templates, not the working directory ones
+        if not directory or not os.path.isdir(directory):
+            return cls()
+        templates = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.npz"))):
+            try:
+                templates.append(TrajectoryTemplate.load(path))
+            except Exception as e:
+                print(f"failed to load trajectory template {path}: {e}")
+        return cls(templates)
+
+    def add_template(self, template: TrajectoryTemplate):
+        if len(self.templates) >= MAX_TRAJECTORY_TEMPLATES:
+            print(
+                f"ignore trajectory template {template.name}, "
+                f"at most {MAX_TRAJECTORY_TEMPLATES} templates are matched"
+            )
+            return False
+
+        self.templates.append(template)
+        self.matchers.append(StreamingDTW(template.frames))
+        return True
+
+    # Gesture source: returns [(movement name, movement type), ...] matched in this frame
+    def detect(self, body, timestamp):
+        detected = []
+        for template, matcher in zip(self.templates, self.matchers):
+            features = normalize_landmarks(body.pose_array, template.indices).ravel()
+            score = matcher.update(features)
+            self.scores[template.name] = score
+
+            if score < template.threshold:
+                detected.append((template.name, template.type))
+                matcher.reset()
+
+        return detected
+
+    def __str__(self):
+        return " | ".join(f"{name}: {score:.2f}" for name, score in self.scores.items())
+
+
+def cut_template(args):
+    session = np.load(args.session)
+    timestamps = session["timestamp"]
+    selected = (timestamps >= args.start) & (timestamps <= args.end)
+    if not selected.any():
+        print("no frames in the selected range")
+        return
+
+    TrajectoryTemplate.save(
+        args.output,
+        name=args.name,
+        movement_type=args.type,
+        poses=session["pose"][selected],
+        landmarks=args.landmarks,
+        threshold=args.threshold,
+    )
+    print(f"saved {selected.sum()} frames to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Cut a trajectory template out of a recorded session"
+    )
+    parser.add_argument("session", help="recorded session .npz")
+    parser.add_argument("output", help="template .npz, e.g. templates/circle.npz")
+    parser.add_argument("--name", required=True, help="movement name")
+    parser.add_argument("--type", default="click", help="command type")
+    parser.add_argument("--start", type=float, required=True, help="start time (ms)")
+    parser.add_argument("--end", type=float, required=True, help="end time (ms)")
+    parser.add_argument(
+        "--landmarks", nargs="+", default=list(DEFAULT_TEMPLATE_LANDMARKS)
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_TEMPLATE_THRESHOLD
+    )
+    cut_template(parser.parse_args())
@@ -1,25 +1,35 @@
+import math
 import numpy as np
 from typing import Literal
 import cv2
 from ..config import IMAGE_WIDTH, IMAGE_HEIGHT
 
 
-# calculate angle in 3D space
+# The feature functions below run many times per frame, they use plain floats
+# instead of building numpy arrays from the landmark tuples.
+
+
+# calculate angle in 3D space (over every component of the given points)
 def calculate_angle(a, b, c):
     if a is None or b is None or c is None:
         return None
 
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-
-    ba = a - b
-    bc = c - b
-
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    angle = np.arccos(cosine_angle)
+    dot = 0.0
+    ba_length = 0.0
+    bc_length = 0.0
+    for a_value, b_value, c_value in zip(a, b, c):
+        ba = a_value - b_value
+        bc = c_value - b_value
+        dot += ba * bc
+        ba_length += ba * ba
+        bc_length += bc * bc
+
+    length = math.sqrt(ba_length * bc_length)
+    if not length:
+        return None
+    cosine_angle = max(-1.0, min(1.0, dot / length))
 
-    return np.degrees(angle)
+    return math.degrees(math.acos(cosine_angle))
 
 
 # 计算 2D 空间中两点形成的向量夹角
@@ -27,17 +37,8 @@ def calculate_2d_angle(p1, p2):
     if p1 is None or p2 is None:
         return None
 
-    p1 = np.array(p1)
-    p2 = np.array(p2)
-
-    # 计算向量
-    vector = p2 - p1
-
     # 计算向量的角度（相对于 X 轴）
-    angle_radians = np.arctan2(vector[1], vector[0])
-    angle_degrees = np.degrees(angle_radians)
-
-    return angle_degrees
+    return math.degrees(math.atan2(p2[1] - p1[1], p2[0] - p1[0]))
 
 
 # calculate slope of a line in 3D space in degrees
@@ -45,16 +46,14 @@ def calculate_slope(a, b):
     if a is None or b is None:
         return None
 
-    a = np.array(a)
-    b = np.array(b)
-
     dx = b[0] - a[0]
     dy = b[1] - a[1]
 
-    angle = np.arctan(dy / dx)
-    angle = angle * 180.0 / np.pi
+    if not dx:
+        # vertical line
+        return math.copysign(90.0, dy) if dy else None
 
-    return angle
+    return math.degrees(math.atan(dy / dx))
 
 
 # calculate distance between two points in 3D space
@@ -120,22 +119,71 @@ def in_range(a, min: float, max: float):
     return a > min and a < max
 
 
-def get_landmark_coordinates(pose_landmarks, world_landmarks, landmark):
-    pose_value = pose_landmarks[landmark.value]
-    world_value = world_landmarks[landmark.value]
-
-    return {
-        "visibility": abs(pose_value.x) <= 1 and abs(pose_value.y) <= 1,
-        "pose": (pose_value.x, pose_value.y, pose_value.z, pose_value.visibility),
-        "world": (world_value.x, world_value.y, world_value.z, world_value.visibility),
-    }
-
-
-def log_landmark(landmark):
-    l = list(
-        map(lambda n: None if not n else f"{' ' if n > 0 else ''}{n:.2f}", landmark)
+# pose_value / world_value: (x, y, z, visibility), `coordinates` an older result to update in place
+def get_landmark_coordinates(pose_value, world_value, coordinates=None):
+    if coordinates is None:
+        coordinates = {}
+    coordinates["visibility"] = abs(pose_value[0]) <= 1 and abs(pose_value[1]) <= 1
+    coordinates["pose"] = tuple(pose_value)
+    coordinates["world"] = tuple(world_value)
+    return coordinates
+
+
+# mediapipe pose landmarks, in index order
+POSE_LANDMARK_NAMES = (
+    "NOSE",
+    "LEFT_EYE_INNER",
+    "LEFT_EYE",
+    "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER",
+    "RIGHT_EYE",
+    "RIGHT_EYE_OUTER",
+    "LEFT_EAR",
+    "RIGHT_EAR",
+    "MOUTH_LEFT",
+    "MOUTH_RIGHT",
+    "LEFT_SHOULDER",
+    "RIGHT_SHOULDER",
+    "LEFT_ELBOW",
+    "RIGHT_ELBOW",
+    "LEFT_WRIST",
+    "RIGHT_WRIST",
+    "LEFT_PINKY",
+    "RIGHT_PINKY",
+    "LEFT_INDEX",
+    "RIGHT_INDEX",
+    "LEFT_THUMB",
+    "RIGHT_THUMB",
+    "LEFT_HIP",
+    "RIGHT_HIP",
+    "LEFT_KNEE",
+    "RIGHT_KNEE",
+    "LEFT_ANKLE",
+    "RIGHT_ANKLE",
+    "LEFT_HEEL",
+    "RIGHT_HEEL",
+    "LEFT_FOOT_INDEX",
+    "RIGHT_FOOT_INDEX",
+)
+POSE_LANDMARKS_COUNT = len(POSE_LANDMARK_NAMES)
+
+# indices used as the body reference frame
+LEFT_SHOULDER_INDEX = POSE_LANDMARK_NAMES.index("LEFT_SHOULDER")
+RIGHT_SHOULDER_INDEX = POSE_LANDMARK_NAMES.index("RIGHT_SHOULDER")
+LEFT_HIP_INDEX = POSE_LANDMARK_NAMES.index("LEFT_HIP")
+RIGHT_HIP_INDEX = POSE_LANDMARK_NAMES.index("RIGHT_HIP")
+
+
+# (33, 4) pose landmarks -> (len(indices), 2) x/y centered on the hips and scaled by the shoulder width
+def normalize_landmarks(pose_array, indices):
+    center = (pose_array[LEFT_HIP_INDEX, :2] + pose_array[RIGHT_HIP_INDEX, :2]) / 2
+    scale = np.linalg.norm(
+        pose_array[LEFT_SHOULDER_INDEX, :2] - pose_array[RIGHT_SHOULDER_INDEX, :2]
     )
-    return f"x: {l[0]}, y: {l[1]}, z: {l[2]}, v: {l[3]}"
+    if scale < 1e-6:
+        scale = 1.0
+
+    return (pose_array[indices, :2] - center) / scale
 
 
 def log_angle(angle):